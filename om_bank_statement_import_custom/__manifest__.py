@@ -3,18 +3,26 @@
     'name': 'OM Bank Statement Import Custom',
     'version': '16.0.1.0.0',
     'category': 'Accounting',
-    'summary': 'Import Bank Statement from CSV/XLSX',
+    'summary': 'Import Bank Statements from CSV, XLSX, CAMT.053, OFX and MT940',
     'description': """
-        Custom module to import bank statements from CSV/XLSX files.
-        Aggregates all transactions from a single file into one Bank Statement.
+        Custom module to import bank statements from CSV/XLSX files with a
+        column mapping, and from CAMT.053, OFX and MT940 files.
+        The transactions of a file go into one Bank Statement, or are split
+        into one statement per day, week, month or number of lines.
     """,
     'author': 'Rahmathullah K',
     'images': ['images/main_screenshot.png'],
     'depends': ['account'],
     'data': [
         'security/ir.model.access.csv',
+        'security/bank_statement_import_security.xml',
+        'data/ir_cron_data.xml',
         'wizard/bank_statement_import_view.xml',
         'views/account_journal_view.xml',
+        'views/account_bank_statement_line_view.xml',
+        'views/bank_statement_import_job_view.xml',
+        'views/bank_statement_import_history_view.xml',
+        'views/bank_statement_import_profile_view.xml',
     ],
     'installable': True,
     'application': False,
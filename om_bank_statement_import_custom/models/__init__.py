@@ -0,0 +1,5 @@
+from . import account_bank_statement_line
+from . import bank_statement_import_history
+from . import bank_statement_import_job
+from . import bank_statement_import_partner
+from . import bank_statement_import_profile
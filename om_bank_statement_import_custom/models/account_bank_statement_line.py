@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+# Bulk insertion of imported statement lines. create() builds each line, its
+# journal entry and the two journal items one record at a time, recomputing
+# and posting them batch after batch. _bulk_create() writes the three tables
+# with multi-row INSERTs instead, then does what create() and action_post()
+# would have done afterwards in a single deferred recompute: the stored
+# computed fields of the new records (entry names, amounts, residuals,
+# is_reconciled, statement balances...) are marked to compute and flushed
+# together, by the same compute methods as the ORM path.
+#
+# _match_open_items() matches imported lines against the open receivable and
+# payable items of their company in one pass, see tools/matching.py.
+from collections import Counter
+
+from odoo import models, fields, api, Command, _
+from odoo.exceptions import UserError
+
+from ..tools.matching import OpenItemIndex
+
+# Rows per INSERT statement
+INSERT_PAGE_SIZE = 1000
+
+
+class AccountBankStatementLine(models.Model):
+    _inherit = 'account.bank.statement.line'
+
+    import_duplicate = fields.Boolean(
+        string='Possible Duplicate', readonly=True, copy=False,
+        help="Set by the statement import when the journal already had a line with the same date, amount, label and partner.")
+    import_match_line_id = fields.Many2one(
+        'account.move.line', string='Proposed Match', readonly=True, copy=False, index='btree_not_null',
+        help="Open invoice or bill item for the full amount of the line, found by the statement import.")
+    import_match_reason = fields.Selection([
+        ('reference', 'Reference'),
+        ('partner', 'Partner and Amount'),
+        ('amount', 'Amount'),
+    ], string='Matched On', readonly=True, copy=False)
+
+    @api.model
+    def _can_bulk_create(self, journal):
+        # Hashed journals secure each entry when it is posted, their lines go
+        # through the ORM
+        return bool(journal.suspense_account_id and journal.default_account_id) \
+            and not journal.restrict_mode_hash_table
+
+    @api.model
+    def _bulk_create(self, vals_list):
+        # vals_list: validated values of the import (see RowConverter) with the
+        # statement_id, of one journal. No line_ids / counterpart_account_id.
+        if not vals_list:
+            return self
+        journal = self.env['account.journal'].browse(vals_list[0]['journal_id'])
+        if not self._can_bulk_create(journal):
+            raise UserError(_("Journal %s does not support the bulk insertion of statement lines.") % journal.display_name)
+        company = journal.company_id
+        journal_currency = journal.currency_id or company.currency_id
+        self.env.flush_all()
+
+        # Values of the inherited fields (date, partner...) go to the entry
+        move_fnames = {name for name, field in self._fields.items() if field.inherited}
+        move_rows, line_rows = [], []
+        for vals in vals_list:
+            vals = dict(vals)
+            # Same normalisation as create()
+            if vals.get('foreign_currency_id') == journal_currency.id:
+                vals['foreign_currency_id'] = None
+                vals['amount_currency'] = 0.0
+            vals['amount'] = journal_currency.round(vals.get('amount') or 0.0)
+            move_vals = {name: vals.pop(name) for name in list(vals) if name in move_fnames}
+            move_vals.update({
+                'journal_id': journal.id,
+                'company_id': company.id,
+                'currency_id': journal_currency.id,
+                'move_type': 'entry',
+                'state': 'posted',
+                'posted_before': True,
+                'narration': False,
+            })
+            vals['currency_id'] = journal_currency.id
+            move_rows.append(move_vals)
+            line_rows.append(vals)
+
+        moves = self._bulk_insert(self.env['account.move'], move_rows)
+        for move, vals in zip(moves, line_rows):
+            vals['move_id'] = move.id
+        st_lines = self._bulk_insert(self, line_rows)
+        self.env.cr.execute(
+            "UPDATE account_move m SET statement_line_id = v.line_id "
+            "FROM (SELECT unnest(%s::int[]) AS move_id, unnest(%s::int[]) AS line_id) v "
+            "WHERE m.id = v.move_id",
+            [moves.ids, st_lines.ids],
+        )
+
+        item_rows = []
+        rates = {}
+        for move, move_vals, vals in zip(moves, move_rows, line_rows):
+            item_rows += self._prepare_bulk_move_line_vals(journal, move.id, move_vals, vals, rates)
+        items = self._bulk_insert(self.env['account.move.line'], item_rows)
+
+        # The deferred recompute
+        self._bulk_created(moves, set().union(*move_rows) | {'statement_line_id'})
+        self._bulk_created(st_lines, set().union(*line_rows))
+        self._bulk_created(items, set().union(*item_rows))
+        self.env.flush_all()
+
+        moves._check_fiscalyear_lock_date()
+        for records, rows in ((moves, move_rows), (st_lines, line_rows), (items, item_rows)):
+            records._validate_fields(set().union(*rows))
+        items.filtered('analytic_distribution')._create_analytic_lines()
+        return st_lines
+
+    @api.model
+    def _prepare_bulk_move_line_vals(self, journal, move_id, move_vals, vals, rates):
+        # The liquidity and counterpart items of a line, as
+        # _prepare_move_line_default_vals() builds them for create()
+        company = journal.company_id
+        company_currency = company.currency_id
+        journal_currency = journal.currency_id or company_currency
+        foreign_currency = self.env['res.currency'].browse(vals.get('foreign_currency_id')) or journal_currency
+
+        journal_amount = vals['amount']
+        if foreign_currency == journal_currency:
+            transaction_amount = journal_amount
+        else:
+            transaction_amount = foreign_currency.round(vals.get('amount_currency') or 0.0)
+        if journal_currency == company_currency:
+            company_amount = journal_amount
+        elif foreign_currency == company_currency:
+            company_amount = transaction_amount
+        else:
+            date = move_vals['date']
+            if date not in rates:
+                rates[date] = journal_currency._get_conversion_rate(journal_currency, company_currency, company, date)
+            company_amount = company_currency.round(journal_amount * rates[date])
+
+        # The related fields are given as well: they are required columns
+        common = {
+            'move_id': move_id,
+            'journal_id': journal.id,
+            'company_id': company.id,
+            'company_currency_id': company_currency.id,
+            'date': move_vals['date'],
+            'parent_state': 'posted',
+            'name': vals.get('payment_ref'),
+            'partner_id': move_vals.get('partner_id') or None,
+            'display_type': 'product',
+        }
+        return [
+            dict(common, account_id=journal.default_account_id.id, currency_id=journal_currency.id,
+                 amount_currency=journal_amount, balance=company_amount),
+            dict(common, account_id=journal.suspense_account_id.id, currency_id=foreign_currency.id,
+                 amount_currency=-transaction_amount, balance=-company_amount),
+        ]
+
+    @api.model
+    def _bulk_insert(self, model, rows):
+        # Insert rows (dicts of field values) into the table of model, with the
+        # defaults of the fields not given, and return the new records in order
+        fnames = sorted(set().union(*rows))
+        default_fnames = [
+            name for name, field in model._fields.items()
+            if field.store and field.column_type and not field.compute and not field.inherited
+            and name not in fnames and name not in models.MAGIC_COLUMNS
+        ]
+        defaults = model.default_get(default_fnames)
+        fnames += [name for name in default_fnames if name in defaults]
+        convert = {name: self._get_column_converter(model, model._fields[name]) for name in fnames}
+
+        uid = self.env.uid
+        columns = fnames + ['create_uid', 'write_uid', 'create_date', 'write_date']
+        # create_date and write_date are the transaction time, as for create()
+        row_template = '(%s)' % ', '.join(['%s'] * (len(fnames) + 2) + ["(now() at time zone 'UTC')"] * 2)
+        query = 'INSERT INTO "%s" (%s) VALUES {} RETURNING id' % (
+            model._table, ', '.join(f'"{column}"' for column in columns))
+        ids = []
+        cr = self.env.cr
+        for start in range(0, len(rows), INSERT_PAGE_SIZE):
+            page = rows[start:start + INSERT_PAGE_SIZE]
+            params = []
+            for row in page:
+                params += [convert[name](row.get(name, defaults.get(name))) for name in fnames]
+                params += [uid, uid]
+            cr.execute(query.format(', '.join([row_template] * len(page))), params)
+            ids += [row[0] for row in cr.fetchall()]
+        return model.browse(ids)
+
+    @api.model
+    def _get_column_converter(self, model, field):
+        # Amounts are rounded before the insert, which saves create() looking
+        # up the currency of every value
+        if field.type in ('float', 'monetary'):
+            return lambda value: float(value or 0.0)
+        return lambda value: field.convert_to_column(value, model, validate=False)
+
+    @api.model
+    def _bulk_created(self, records, fnames):
+        # What create() does after its INSERT: the stored computed fields that
+        # were not given are computed, and the fields depending on the new
+        # records (on themselves and other models) are marked to recompute.
+        # Given fields are protected against recomputation, as in create().
+        given = [records._fields[name] for name in fnames if name in records._fields]
+        with self.env.protecting(given, records):
+            for field in records._fields.values():
+                if field.store and field.compute and not field.inherited and field.name not in fnames:
+                    self.env.add_to_compute(field, records)
+            records.modified(list(records._fields), create=True)
+
+    def _get_transaction_currency_amount(self):
+        # (currency, amount) of the line in the currency of the transaction
+        self.ensure_one()
+        if self.foreign_currency_id:
+            return self.foreign_currency_id, self.amount_currency
+        return self.journal_id.currency_id or self.company_id.currency_id, self.amount
+
+    def _match_open_items(self, apply=False):
+        # Match the lines against the open items of their company. With
+        # apply, the matches found by reference or by partner and amount are
+        # reconciled, the other matches are kept as proposals. Return the
+        # number of lines by reason, plus 'reconciled'.
+        counts = Counter()
+        lines = self.filtered(lambda line: not line.is_reconciled)
+        for company in lines.company_id:
+            company_lines = lines.filtered(lambda line: line.company_id == company)
+            index = self._get_open_item_index(company)
+            if not index:
+                continue
+            proposals, to_reconcile = [], []
+            for line in company_lines:
+                currency, amount = line._get_transaction_currency_amount()
+                item_id, reason = index.match(currency.id, amount, line.partner_id.id, line.payment_ref)
+                if not item_id:
+                    continue
+                counts[reason] += 1
+                if apply and reason != 'amount':
+                    to_reconcile.append((line, item_id))
+                else:
+                    proposals.append((line.id, item_id, reason))
+            self._set_import_matches(proposals)
+            counts['reconciled'] += len(self._reconcile_import_matches(to_reconcile))
+        return counts
+
+    @api.model
+    def _get_open_item_index(self, company):
+        # The posted, unreconciled receivable and payable items of the
+        # company, loaded with a single query
+        self.env['account.move.line'].flush_model()
+        self.env['account.move'].flush_model(['name', 'ref', 'payment_reference'])
+        self.env.cr.execute("""
+            SELECT l.id, l.partner_id, l.currency_id, l.amount_residual_currency,
+                   m.name, m.ref, m.payment_reference
+              FROM account_move_line l
+              JOIN account_move m ON m.id = l.move_id
+              JOIN account_account a ON a.id = l.account_id
+             WHERE l.company_id = %s
+               AND l.parent_state = 'posted'
+               AND a.account_type IN ('asset_receivable', 'liability_payable')
+               AND NOT l.reconciled
+               AND l.amount_residual_currency != 0
+        """, [company.id])
+        rows = self.env.cr.fetchall()
+        currencies = self.env['res.currency'].browse({row[2] for row in rows})
+        return OpenItemIndex(
+            ((item_id, partner_id, currency_id, amount, references)
+             for item_id, partner_id, currency_id, amount, *references in rows),
+            digits={currency.id: currency.decimal_places for currency in currencies},
+        )
+
+    @api.model
+    def _set_import_matches(self, proposals):
+        # proposals: (statement line id, move line id or None, reason or None),
+        # written with one query
+        if not proposals:
+            return
+        line_ids, item_ids, reasons = zip(*proposals)
+        self.flush_model(['import_match_line_id', 'import_match_reason'])
+        self.env.cr.execute(
+            "UPDATE account_bank_statement_line l SET import_match_line_id = v.item_id, import_match_reason = v.reason "
+            "FROM (SELECT unnest(%s::int[]) AS line_id, unnest(%s::int[]) AS item_id, unnest(%s::varchar[]) AS reason) v "
+            "WHERE l.id = v.line_id",
+            [list(line_ids), list(item_ids), list(reasons)],
+        )
+        self.browse(line_ids).invalidate_recordset(['import_match_line_id', 'import_match_reason'])
+
+    @api.model
+    def _reconcile_import_matches(self, pairs):
+        # pairs: (statement line, move line id). The suspense item of each
+        # line is moved to the account and partner of its open item, then both
+        # are reconciled. Lines or items changed since they were matched are
+        # left alone. Return the lines reconciled.
+        reconciled = self.browse()
+        items = self.env['account.move.line'].browse([item_id for _line, item_id in pairs])
+        for (st_line, _item_id), item in zip(pairs, items):
+            liquidity_lines, suspense_lines, other_lines = st_line._seek_for_lines()
+            currency, amount = st_line._get_transaction_currency_amount()
+            if len(liquidity_lines) != 1 or len(suspense_lines) != 1 or other_lines or item.reconciled \
+                    or item.currency_id != currency or currency.compare_amounts(item.amount_residual_currency, amount):
+                continue
+            partner = st_line.partner_id or item.partner_id
+            st_line.move_id.with_context(skip_readonly_check=True, skip_account_move_synchronization=True).write({
+                'partner_id': partner.id,
+                'line_ids': [
+                    Command.update(liquidity_lines.id, {'partner_id': partner.id}),
+                    Command.update(suspense_lines.id, {'account_id': item.account_id.id, 'partner_id': partner.id}),
+                ],
+            })
+            (suspense_lines + item).reconcile()
+            reconciled |= st_line
+        self._set_import_matches([(line.id, None, None) for line in reconciled])
+        return reconciled
+
+    def action_reconcile_import_match(self):
+        # Reconcile the proposed matches of the selected lines
+        lines = self.filtered(lambda line: line.import_match_line_id and not line.is_reconciled)
+        reconciled = self._reconcile_import_matches([(line, line.import_match_line_id.id) for line in lines])
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Proposed Matches"),
+                'message': _("%d of %d lines reconciled.") % (len(reconciled), len(lines)),
+                'type': 'success' if len(reconciled) == len(lines) else 'warning',
+            },
+        }
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+
+
+class BankStatementImportHistory(models.Model):
+    _name = 'om.bank.statement.import.history'
+    _description = 'Bank Statement Import History'
+    _order = 'id desc'
+
+    name = fields.Char(string='File Name', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='Imported By', default=lambda self: self.env.user, readonly=True)
+    journal_id = fields.Many2one('account.journal', string='Journal', readonly=True)
+    statement_ids = fields.Many2many('account.bank.statement', string='Bank Statements', readonly=True)
+    dry_run = fields.Boolean(string='Test Import', readonly=True)
+    rows_valid = fields.Integer(string='Valid Rows', readonly=True)
+    rows_skipped = fields.Integer(string='Skipped Rows', readonly=True)
+    duration = fields.Float(string='Duration (s)', readonly=True)
+    query_count = fields.Integer(string='SQL Queries', readonly=True)
+    # Seconds and query count per phase, and counters, as logged
+    profile = fields.Json(string='Profile', readonly=True)
+    report = fields.Text(string='Breakdown', readonly=True)
+    # Every rejected row with its row number and error, one CSV per file
+    reject_attachment_ids = fields.Many2many('ir.attachment', string='Rejected Rows', readonly=True)
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from contextlib import contextmanager
+from odoo import models, fields, _, api
+from odoo.exceptions import UserError
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
+from psycopg2 import OperationalError
+
+_logger = logging.getLogger(__name__)
+
+# First key of the advisory locks claiming jobs, the second one is the job id
+JOB_LOCK_NAMESPACE = 0x0B5713
+
+
+class BankStatementImportJob(models.Model):
+    _name = 'om.bank.statement.import.job'
+    _description = 'Bank Statement Import Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='File Name', required=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='Requested By', default=lambda self: self.env.user, readonly=True)
+    journal_id = fields.Many2one('account.journal', string='Journal', required=True, readonly=True)
+    company_id = fields.Many2one(related='journal_id.company_id')
+    attachment_id = fields.Many2one('ir.attachment', string='File', readonly=True)
+    statement_ids = fields.Many2many('account.bank.statement', string='Bank Statements', readonly=True)
+    # Statement id of each partition of a split import, by split key
+    split_statements = fields.Json(string='Statements by Partition', readonly=True)
+
+    # Wizard state the job was created from
+    mapping = fields.Json(string='Column Mapping', readonly=True)
+    import_options = fields.Json(string='Import Options', readonly=True)
+
+    # Progress, committed together with each chunk of lines
+    last_row = fields.Integer(string='Last Committed Row', readonly=True,
+                              help="Row number of the file up to which lines are committed. A crashed job resumes after it.")
+    rows_done = fields.Integer(string='Rows Imported', readonly=True)
+    rows_skipped = fields.Integer(string='Rows Skipped', readonly=True)
+    duration = fields.Float(string='Processing Time (s)', readonly=True)
+    throughput = fields.Float(string='Rows per Second', compute='_compute_throughput')
+    date_start = fields.Datetime(string='Started On', readonly=True)
+    date_end = fields.Datetime(string='Finished On', readonly=True)
+    log = fields.Text(string='Log', readonly=True)
+    # Error counters and examples by category, carried from chunk to chunk
+    error_summary = fields.Json(string='Errors', readonly=True)
+    # One reject file per committed chunk with rejected rows
+    reject_attachment_ids = fields.Many2many('ir.attachment', string='Rejected Rows', readonly=True)
+
+    @api.depends('rows_done', 'rows_skipped', 'duration')
+    def _compute_throughput(self):
+        for job in self:
+            rows = job.rows_done + job.rows_skipped
+            job.throughput = rows / job.duration if job.duration else 0.0
+
+    def unlink(self):
+        (self.attachment_id | self.reject_attachment_ids).sudo().unlink()
+        return super().unlink()
+
+    def action_retry(self):
+        # Failed jobs restart from their last committed chunk. Users only
+        # read jobs, the ones they see (their own) are retried as superuser.
+        self.filtered(lambda job: job.state == 'failed').sudo().write({'state': 'pending'})
+        self._trigger_cron()
+
+    @api.model
+    def _trigger_cron(self):
+        self.env.ref('om_bank_statement_import_custom.ir_cron_bank_statement_import_job').sudo()._trigger()
+
+    def action_open_statement(self):
+        self.ensure_one()
+        if len(self.statement_ids) > 1:
+            return {
+                'type': 'ir.actions.act_window',
+                'name': _('Bank Statements'),
+                'view_mode': 'tree,form',
+                'res_model': 'account.bank.statement',
+                'domain': [('id', 'in', self.statement_ids.ids)],
+                'target': 'current',
+            }
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Bank Statement'),
+            'view_mode': 'form',
+            'res_model': 'account.bank.statement',
+            'res_id': self.statement_ids.id,
+            'target': 'current',
+        }
+
+    @api.model
+    def _cron_process_jobs(self):
+        # Jobs are claimed with a session advisory lock, which outlives the
+        # commits of their chunks, so several workers can process jobs at once
+        # (into different journals, see _process()) without taking the same
+        # one. 'running' jobs that are not claimed are ones whose worker
+        # died, they resume from last_row. Jobs are read and updated as
+        # superuser, their lines are imported as the user who requested them.
+        time_budget = int(self.env['ir.config_parameter'].sudo().get_param(
+            'om_bank_statement_import_custom.job_time_budget', 300))
+        deadline = time.monotonic() + time_budget
+        for job in self.sudo().search([('state', 'in', ('pending', 'running'))], order='id'):
+            if time.monotonic() >= deadline:
+                # Leave the rest for the next run, right away rather than at the next interval
+                self._trigger_cron()
+                break
+            with job._claim() as claimed:
+                if claimed:
+                    job.with_company(job.company_id)._process(deadline)
+
+    @contextmanager
+    def _claim(self):
+        self.ensure_one()
+        cr = self.env.cr
+        cr.execute("SELECT pg_try_advisory_lock(%s, %s)", [JOB_LOCK_NAMESPACE, self.id])
+        claimed = cr.fetchone()[0]
+        try:
+            # Another worker may have finished the job since it was searched
+            yield claimed and self.browse(self.id).exists().state in ('pending', 'running')
+        finally:
+            if claimed:
+                cr.execute("SELECT pg_advisory_unlock(%s, %s)", [JOB_LOCK_NAMESPACE, self.id])
+
+    def _add_rejected_rows(self, errors, row_idx):
+        # Reject file of the chunk ending at row_idx, the files of the
+        # earlier chunks are left as they are
+        self.reject_attachment_ids = [(4, self.env['ir.attachment'].create({
+            'name': f"{self.name.rsplit('.', 1)[0]}_rejected_{self.last_row + 1}-{row_idx}.csv",
+            'raw': errors.get_reject_content(),
+            'mimetype': 'text/csv',
+            'res_model': self._name,
+            'res_id': self.id,
+        }).id)]
+
+    def _get_import_wizard(self):
+        # The wizard, and the records it creates, run as the requesting user
+        Import = self.env['om.bank.statement.import'].with_user(self.user_id)
+        return Import._new_from_options(self.import_options, self.journal_id, self.attachment_id)
+
+    def _process(self, deadline):
+        self.ensure_one()
+        if self.state == 'pending':
+            self.write({'state': 'running', 'date_start': self.date_start or fields.Datetime.now()})
+            self.env.cr.commit()
+
+        wizard = self._get_import_wizard()
+        # The journal lock ends with each commit and is taken again for the
+        # next chunk. While another import runs into the journal the job
+        # waits for a later run.
+        if not wizard._try_lock_journals(self.journal_id):
+            return
+
+        mapping = self.mapping
+        batch_size = wizard.batch_size if wizard.batch_size > 0 else 1000
+        started = time.monotonic()
+
+        def commit_progress(row_idx, done, skipped, errors):
+            nonlocal started
+            now = time.monotonic()
+            vals = {
+                'last_row': row_idx,
+                'rows_done': self.rows_done + done,
+                'rows_skipped': self.rows_skipped + skipped,
+                'duration': self.duration + now - started,
+            }
+            if errors.rejected:
+                vals['error_summary'] = errors.to_dict()
+                vals['log'] = '\n'.join(errors.report_lines())
+                self._add_rejected_rows(errors, row_idx)
+            self.write(vals)
+            self.env.cr.commit()
+            started = now
+            return wizard._try_lock_journals(self.journal_id)
+
+        try:
+            with wizard._open_staged_file() as stream:
+                def iter_rows():
+                    return wizard._iter_numbered_rows(stream)
+
+                def create_lines(lines_vals):
+                    # Statements are created with their first lines, so no empty
+                    # statement is left behind when no row is valid
+                    by_key = {}
+                    for key, vals in lines_vals:
+                        by_key.setdefault(key, []).append(vals)
+                    split_statements = dict(self.split_statements or {})
+                    for key, key_lines in by_key.items():
+                        key = key or ''
+                        statement = wizard.env['account.bank.statement'].browse(split_statements.get(key))
+                        if not statement:
+                            statement = statement.create(wizard._prepare_statement_vals(key))
+                            split_statements[key] = statement.id
+                            self.statement_ids |= statement
+                        wizard._create_statement_lines(statement, key_lines)
+                    if by_key:
+                        self.split_statements = split_statements
+
+                lookups, keys = wizard._prefetch_related_records(iter_rows(), mapping)
+                convert = wizard._get_row_converter(mapping, **lookups)
+                # Lines committed by this job before a restart are not duplicates
+                duplicates = wizard._get_duplicate_checker(
+                    *wizard._get_date_range(convert, keys['dates']), keys['import_ids'],
+                    exclude_statements=self.statement_ids)
+
+                lines_vals = []
+                errors = wizard._get_error_collector(state=self.error_summary)
+                skipped = 0
+                resume_after = row_idx = self.last_row
+                for row_idx, row in iter_rows():
+                    if row_idx <= resume_after or not row or not any(row):
+                        continue
+                    try:
+                        vals = convert(row)
+                    except Exception as e:
+                        skipped += 1
+                        errors.add(row_idx, str(e), row)
+                        if wizard.on_error == 'fail':
+                            raise
+                    else:
+                        duplicate = duplicates.check(vals) if duplicates else False
+                        if duplicate and not wizard._flag_duplicate(vals, duplicate, row_idx):
+                            # Skipped, as by the wizard, not a rejected row
+                            skipped += 1
+                        else:
+                            lines_vals.append((wizard._get_split_key(vals, self.rows_done + len(lines_vals)), vals))
+                    if len(lines_vals) + skipped >= batch_size:
+                        create_lines(lines_vals)
+                        locked = commit_progress(row_idx, len(lines_vals), skipped, errors)
+                        errors.close()
+                        # Counters go on, the next chunk has its own reject file
+                        errors = wizard._get_error_collector(state=self.error_summary)
+                        lines_vals, skipped = [], 0
+                        if not locked or time.monotonic() >= deadline:
+                            self._trigger_cron()
+                            return
+
+                create_lines(lines_vals)
+                if not self.statement_ids:
+                    raise UserError(_("No valid transactions found."))
+                statements = self.statement_ids.with_env(wizard.env)
+                wizard._chain_statement_balances(statements)
+                wizard._match_imported_lines(statements)
+                commit_progress(row_idx, len(lines_vals), skipped, errors)
+                errors.close()
+                self.write({'state': 'done', 'date_end': fields.Datetime.now()})
+                self.env.cr.commit()
+        except Exception as e:
+            # Lines of the chunk being processed are dropped, earlier chunks stay committed
+            self.env.cr.rollback()
+            if isinstance(e, OperationalError) and e.pgcode in PG_CONCURRENCY_ERRORS_TO_RETRY:
+                # A concurrent import created the same partners, the chunk is
+                # imported again by the next run with a snapshot that sees them
+                _logger.info(f"Bank statement import job {self.id} postponed by a concurrent update: {e}")
+                self._trigger_cron()
+                return
+            _logger.warning(f"Bank statement import job {self.id} failed: {e}")
+            self.write({
+                'state': 'failed',
+                'date_end': fields.Datetime.now(),
+                'log': '\n'.join(filter(None, [self.log, str(e)])),
+            })
+            self.env.cr.commit()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# Partners created by imports, by lowercased name. The unique key makes the
+# creation of a partner an upsert: two imports running at once cannot both
+# create the same name, the second one either reads the partner of the first
+# (committed before it started) or fails with a serialization error and is
+# retried with a snapshot that sees it.
+from odoo import models, fields, api
+
+
+class BankStatementImportPartner(models.Model):
+    _name = 'om.bank.statement.import.partner'
+    _description = 'Partner Created by Bank Statement Import'
+    _rec_name = 'name_key'
+
+    name_key = fields.Char(string='Name', required=True, readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Partner', readonly=True, ondelete='cascade')
+
+    _sql_constraints = [
+        ('name_key_unique', 'unique(name_key)', 'A partner name can only be registered once.'),
+    ]
+
+    @api.model
+    def _claim(self, keys):
+        # Register the keys not registered yet. Return the keys claimed by
+        # this transaction, whose partners are to be created, and the partner
+        # id of the others.
+        if not keys:
+            return set(), {}
+        self.flush_model()
+        self.env.cr.execute("""
+            INSERT INTO om_bank_statement_import_partner (name_key, create_uid, write_uid, create_date, write_date)
+            SELECT key, %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+              FROM unnest(%(keys)s::varchar[]) AS key
+            ON CONFLICT (name_key) DO NOTHING
+            RETURNING name_key
+        """, {'uid': self.env.uid, 'keys': list(keys)})
+        claimed = {key for key, in self.env.cr.fetchall()}
+        others = [key for key in keys if key not in claimed]
+        known = {}
+        if others:
+            self.env.cr.execute("""
+                SELECT name_key, partner_id
+                  FROM om_bank_statement_import_partner
+                 WHERE name_key = ANY(%s) AND partner_id IS NOT NULL
+            """, [others])
+            known = dict(self.env.cr.fetchall())
+        return claimed, known
+
+    @api.model
+    def _register(self, partner_by_key):
+        # Set the partners created for claimed keys
+        if not partner_by_key:
+            return
+        keys, partner_ids = zip(*partner_by_key.items())
+        self.env.cr.execute("""
+            UPDATE om_bank_statement_import_partner r
+               SET partner_id = v.partner_id
+              FROM (SELECT unnest(%s::varchar[]) AS name_key, unnest(%s::int[]) AS partner_id) v
+             WHERE r.name_key = v.name_key
+        """, [list(keys), list(partner_ids)])
+
+    @api.model
+    def _release(self, keys):
+        # Claimed keys whose partners could not be created
+        if keys:
+            self.env.cr.execute("DELETE FROM om_bank_statement_import_partner WHERE name_key = ANY(%s)", [list(keys)])
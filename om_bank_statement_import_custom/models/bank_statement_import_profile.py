@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+# Saved column mappings and options, for imports without the wizard: the
+# import_file() RPC method and the scheduled import of the files dropped in a
+# watched directory. Files go through the same pipeline as the wizard, with an
+# in-memory wizard built from the profile, and return structured results.
+import base64
+import logging
+import os
+import shutil
+import time
+
+from odoo import models, fields, api, _
+from odoo.exceptions import AccessError, UserError
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
+from psycopg2 import OperationalError
+
+from ..tools.profiling import ImportProfiler
+from ..wizard.bank_statement_import import JournalBusyError
+
+_logger = logging.getLogger(__name__)
+
+# Subdirectories of a watched directory receiving the files once imported
+PROCESSED_DIRECTORY = 'processed'
+FAILED_DIRECTORY = 'failed'
+
+
+class BankStatementImportProfile(models.Model):
+    _name = 'om.bank.statement.import.profile'
+    _description = 'Bank Statement Import Profile'
+    _order = 'name'
+
+    name = fields.Char(string='Name', required=True)
+    active = fields.Boolean(default=True)
+    journal_id = fields.Many2one('account.journal', string='Journal', domain=[('type', '=', 'bank')],
+                                 help="Journal of the files imported with this profile, unless another one is given.")
+    company_id = fields.Many2one(related='journal_id.company_id')
+    # Target field by column name, and the wizard options (see _get_import_options)
+    mapping = fields.Json(string='Column Mapping', readonly=True)
+    import_options = fields.Json(string='Import Options', readonly=True)
+    watch_directory = fields.Char(
+        string='Watched Directory', groups='base.group_system',
+        help="Server directory whose files are imported by the scheduled action. "
+             f"Imported files are moved to its '{PROCESSED_DIRECTORY}' subdirectory, "
+             f"files that failed to its '{FAILED_DIRECTORY}' subdirectory.")
+    mapping_summary = fields.Text(string='Mapped Columns', compute='_compute_mapping_summary')
+
+    @api.depends('mapping')
+    def _compute_mapping_summary(self):
+        targets = dict(self.env['om.bank.statement.import.mapping']._fields['target_field'].selection)
+        for profile in self:
+            profile.mapping_summary = "\n".join(
+                f"{column} → {targets.get(target, target)}" for column, target in (profile.mapping or {}).items())
+
+    @api.model
+    def _prepare_from_wizard(self, wizard):
+        # Profile values of the options and mapping of an import wizard
+        options = wizard._get_import_options()
+        mapping_lines = options.pop('mapping_lines')
+        for name in ('file_name', 'sheet_options'):
+            options.pop(name)
+        return {
+            'journal_id': wizard.journal_id.id,
+            'mapping': {line['column_name']: line['target_field'] for line in mapping_lines if line['target_field']},
+            'import_options': options,
+        }
+
+    def _map_columns(self, lines):
+        # Targets of the preview lines of a CSV/XLSX file, by column name, so
+        # files whose columns moved are still mapped right
+        mapping = self.mapping or {}
+        return [dict(line, target_field=mapping.get(line['column_name'], False)) for line in lines]
+
+    def _get_import_wizard(self, journal, file_name, attachment):
+        Import = self.env['om.bank.statement.import']
+        options = dict(self.import_options or {}, file_name=file_name)
+        wizard = Import._new_from_options(dict(options, profile_id=self.id), journal, attachment)
+        wizard.mapping_line_ids = [(0, 0, line) for line in wizard._apply_profile_mapping(wizard._get_preview_lines())]
+        return wizard
+
+    def import_file(self, file_name=None, file_data=None, file_path=None, journal_id=None, dry_run=False):
+        # RPC entry point: import a statement file given as base64 data (raw
+        # bytes when called from the server) or as a server path, reserved to
+        # administrators, and return its result, see _import_content()
+        self.ensure_one()
+        if file_path:
+            if not self.env.is_system():
+                raise AccessError(_("Only administrators can import files from the server."))
+            with open(file_path, 'rb') as statement_file:
+                raw_data = statement_file.read()
+            file_name = file_name or os.path.basename(file_path)
+        elif file_data:
+            raw_data = base64.b64decode(file_data) if isinstance(file_data, str) else file_data
+        else:
+            raise UserError(_("No file to import."))
+        journal = self.env['account.journal'].browse(journal_id) if journal_id else self.journal_id
+        if not journal:
+            raise UserError(_("Profile %s has no journal, give the journal to import into.") % self.name)
+        return self._import_content(journal, file_name or 'Imported Statement', raw_data, dry_run=dry_run)
+
+    def _import_content(self, journal, file_name, raw_data, dry_run=False):
+        # Errors of the file (format, mapping, rows with "Stop Import") are
+        # returned in the result, its changes undone; concurrency errors and
+        # a journal busy with another import are raised for the caller to
+        # retry
+        Import = self.env['om.bank.statement.import']
+        result = {
+            'file_name': file_name,
+            'journal_id': journal.id,
+            'profile_id': self.id,
+            'state': 'tested' if dry_run else 'done',
+            'statement_ids': [],
+            'history_id': False,
+            'rows_valid': 0,
+            'rows_skipped': 0,
+            'duration': 0.0,
+            'reject_attachment_id': False,
+            'log': [],
+            'error': False,
+        }
+        profiler = ImportProfiler(self.env.cr)
+        try:
+            with self.env.cr.savepoint():
+                attachment = Import._stage_content(raw_data, file_name)
+                wizard = self._get_import_wizard(journal, file_name, attachment)
+                res, history = wizard._run_import(wizard._get_mapping(), profiler, dry_run=dry_run)
+        except JournalBusyError:
+            raise
+        except UserError as e:
+            result.update(state='failed', error=e.args[0])
+            return result
+        if dry_run:
+            result['log'] = res
+        else:
+            result['statement_ids'] = res.ids
+        result.update({
+            'history_id': history.id,
+            'rows_valid': history.rows_valid,
+            'rows_skipped': history.rows_skipped,
+            'duration': history.duration,
+            'reject_attachment_id': wizard.reject_attachment_id.id,
+        })
+        return result
+
+    @api.model
+    def _cron_import_directories(self):
+        # Import the files of the watched directories, committing each file.
+        # A file stays in place when a concurrent import made it fail or holds
+        # its journal, for the next run.
+        time_budget = int(self.env['ir.config_parameter'].sudo().get_param(
+            'om_bank_statement_import_custom.job_time_budget', 300))
+        deadline = time.monotonic() + time_budget
+        for profile in self.sudo().search([('watch_directory', '!=', False)]):
+            directory = profile.watch_directory
+            if not os.path.isdir(directory):
+                _logger.warning(f"Bank statement import profile {profile.name!r}: {directory} is not a directory")
+                continue
+            file_names = sorted(
+                name for name in os.listdir(directory)
+                if not name.startswith('.') and os.path.isfile(os.path.join(directory, name)))
+            for file_name in file_names:
+                if time.monotonic() >= deadline:
+                    self.env.ref('om_bank_statement_import_custom.ir_cron_bank_statement_import_directories')._trigger()
+                    return
+                path = os.path.join(directory, file_name)
+                try:
+                    result = profile.import_file(file_path=path)
+                    self.env.cr.commit()
+                except Exception as e:
+                    self.env.cr.rollback()
+                    if isinstance(e, JournalBusyError) or (
+                            isinstance(e, OperationalError) and e.pgcode in PG_CONCURRENCY_ERRORS_TO_RETRY):
+                        _logger.info(f"Bank statement import of {path} postponed by a concurrent import: {e}")
+                        continue
+                    _logger.exception(f"Bank statement import of {path} failed")
+                    result = {'state': 'failed', 'error': str(e)}
+                _logger.info(f"Bank statement import of {path}: {result}")
+                target = os.path.join(directory, FAILED_DIRECTORY if result['state'] == 'failed' else PROCESSED_DIRECTORY)
+                os.makedirs(target, exist_ok=True)
+                shutil.move(path, os.path.join(target, file_name))
@@ -0,0 +1,10 @@
+from . import test_import_benchmark
+from . import test_bulk_insert
+from . import test_import_access
+from . import test_statement_formats
+from . import test_csv_parallel
+from . import test_sniffing
+from . import test_dedupe
+from . import test_columnar
+from . import test_partner_matcher
+from . import test_matching
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+import base64
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+class BankStatementImportCommon(AccountTestInvoicingCommon):
+
+    @classmethod
+    def _create_import_wizard(cls, journal, file_name, data, **options):
+        # A wizard with its file staged and its columns mapped as previewed,
+        # the foreign amount of the generated statements included
+        wizard = cls.env['om.bank.statement.import'].create(dict(
+            options,
+            journal_id=journal.id,
+            file_name=file_name,
+            file_data=base64.b64encode(data),
+        ))
+        wizard.staged_attachment_id = wizard._stage_file()
+        wizard.mapping_line_ids = [(0, 0, vals) for vals in wizard._get_preview_lines()]
+        wizard.mapping_line_ids.filtered(lambda line: line.column_name == 'Foreign Amount').target_field = 'amount_currency'
+        return wizard
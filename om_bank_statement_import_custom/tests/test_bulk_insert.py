@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# The bulk insertion of statement lines must give the same accounting result
+# as the ORM: the same statements, statement lines, journal entries and
+# journal items, whichever way the lines were created.
+from odoo.tests import tagged
+
+from ..tools import statement_generator
+from .common import BankStatementImportCommon
+
+ROWS = 200
+
+
+@tagged('post_install', '-at_install')
+class TestBulkInsert(BankStatementImportCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        (cls.env.ref('base.USD') | cls.env.ref('base.GBP')).active = True
+        cls.data = statement_generator.generate(
+            'csv', rows=ROWS, partners=20, currencies=('USD', 'GBP'), foreign_ratio=0.2, days=45)
+
+    def _import(self, journal, **options):
+        wizard = self._create_import_wizard(journal, 'statement.csv', self.data, duplicate_handling='none', **options)
+        with wizard._open_staged_file() as stream:
+            statement = wizard._import_csv(stream, wizard._get_mapping())
+        statement.invalidate_recordset()
+        return statement
+
+    def _snapshot(self, statement):
+        # Accounts are compared by their role, the two journals have their own
+        journal = statement.journal_id
+        roles = {journal.default_account_id: 'liquidity', journal.suspense_account_id: 'suspense'}
+        lines = []
+        for st_line in statement.line_ids.sorted(lambda line: line.unique_import_id):
+            move = st_line.move_id
+            lines.append({
+                'line': (
+                    st_line.date, st_line.payment_ref, st_line.partner_id, st_line.amount,
+                    st_line.foreign_currency_id, st_line.amount_currency, st_line.currency_id,
+                    st_line.amount_residual, st_line.is_reconciled, st_line.unique_import_id[len(str(journal.id)):],
+                ),
+                'move': (
+                    move.state, move.move_type, move.date, move.partner_id, move.currency_id,
+                    move.amount_total, move.amount_total_signed, move.payment_state, bool(move.name and move.name != '/'),
+                    move.sequence_prefix.replace(journal.code, '') if move.sequence_prefix else False,
+                ),
+                'items': sorted((
+                    roles.get(item.account_id), item.partner_id, item.currency_id, item.amount_currency,
+                    item.balance, item.debit, item.credit, item.amount_residual, item.amount_residual_currency,
+                    item.reconciled, item.parent_state, item.display_type, item.name,
+                ) for item in move.line_ids),
+            })
+        totals = (statement.balance_start, statement.balance_end, statement.balance_end_real,
+                  statement.is_complete, statement.is_valid, len(statement.line_ids))
+        return totals, lines
+
+    def _assert_same_result(self, **options):
+        orm_journal = self.company_data['default_journal_bank']
+        bulk_journal = orm_journal.copy({'name': 'Bulk Bank', 'code': 'BLK'})
+        orm_statement = self._import(orm_journal, insert_mode='orm', **options)
+        bulk_statement = self._import(bulk_journal, insert_mode='bulk', **options)
+
+        orm_totals, orm_lines = self._snapshot(orm_statement)
+        bulk_totals, bulk_lines = self._snapshot(bulk_statement)
+        self.assertEqual(bulk_totals, orm_totals)
+        self.assertEqual(len(bulk_lines), ROWS)
+        for orm_line, bulk_line in zip(orm_lines, bulk_lines):
+            self.assertEqual(bulk_line, orm_line)
+        # Entries are numbered in the same sequence as the ORM would
+        self.assertEqual(
+            sorted(name.replace('BLK', '') for name in bulk_statement.line_ids.move_id.mapped('name')),
+            sorted(name.replace(orm_journal.code, '') for name in orm_statement.line_ids.move_id.mapped('name')),
+        )
+
+    def test_bulk_insert_batches(self):
+        self._assert_same_result(batch_size=64)
+
+    def test_bulk_insert_single_batch(self):
+        self._assert_same_result(batch_size=0)
+
+    def test_bulk_insert_hashed_journal(self):
+        # Journals securing their entries fall back to the ORM
+        journal = self.company_data['default_journal_bank']
+        journal.restrict_mode_hash_table = True
+        statement = self._import(journal, insert_mode='bulk', batch_size=64)
+        self.assertEqual(len(statement.line_ids), ROWS)
+        self.assertTrue(all(statement.line_ids.move_id.mapped('inalterable_hash')))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Columnar dry run: the date and amount columns validated in bulk must give
+# the errors, totals and date range of the row converter.
+from datetime import date
+from unittest import skipIf
+
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+
+from ..tools import columnar
+from ..tools.converter import RowConverter
+from ..tools.parsing import DATE_FORMATS
+
+TODAY = date(2026, 1, 31)
+
+
+def _converter(date_format, thousand_sep=',', decimal_sep='.'):
+    return RowConverter(
+        {'date': 0, 'amount': 1}, date_fmt=DATE_FORMATS[date_format], thousand_sep=thousand_sep,
+        decimal_sep=decimal_sep, col_names={0: 'Date', 1: 'Amount'}, journal_id=1, today=TODAY)
+
+
+@skipIf(columnar.np is None, "NumPy is not installed")
+@tagged('post_install', '-at_install')
+class TestColumnar(BaseCase):
+
+    def test_validate_columns(self):
+        dates = ['05.01.2026', ' 31.01.2026', '31.02.2026', '', date(2026, 1, 2), '06.01.2026']
+        amounts = ['1.234,50', '-34,50', '10,00', '-200', 5.0, 'abc']
+        report = columnar.validate_columns(_converter('eu_dot', '.', ','), 'eu_dot', [2, 3, 4, 5, 6, 7], dates, amounts)
+        self.assertEqual([row for row, _message in report['errors']], [4, 7])
+        self.assertIn("Date Error", report['errors'][0][1])
+        self.assertIn("Amount Error", report['errors'][1][1])
+        self.assertEqual(report['valid'], 4)
+        self.assertFalse(report['stopped'])
+        self.assertAlmostEqual(report['credit'], 1239.5)
+        self.assertAlmostEqual(report['debit'], -234.5)
+        # An empty date is the date of the day, as for the row converter
+        self.assertEqual((report['date_from'], report['date_to']), (date(2026, 1, 2), TODAY))
+
+    def test_max_errors(self):
+        dates = ['2026-01-05', 'x', '2026-01-07', 'y', '2026-01-09']
+        report = columnar.validate_columns(
+            _converter('iso_dash'), 'iso_dash', [1, 2, 3, 4, 5], dates, ['1'] * 5, max_errors=1)
+        self.assertEqual([row for row, _message in report['errors']], [2])
+        self.assertTrue(report['stopped'])
+        self.assertEqual((report['valid'], report['last_row']), (1, 2))
+        self.assertEqual(report['date_to'], date(2026, 1, 5))
+
+    def test_short_year(self):
+        dates, valid = columnar.parse_date_column(['01/02/68', '1/2/69', '13/01/26'], 'us_short')
+        self.assertEqual(list(valid), [True, True, False])
+        self.assertEqual([value.astype(object) for value in dates[:2]], [date(2068, 1, 2), date(1969, 1, 2)])
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Chunks of the parallel CSV parsing must hold whole records: parsed one by
+# one, they give the rows csv.reader gives for the whole file.
+import csv
+import io
+
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+
+from ..tools import csv_parallel
+
+SAMPLES = {
+    'quoted newlines': b'Date,Label,Amount\n01/02/2026,"two\nlines",1.5\n02/02/2026,"three\nshort\nlines",-2\n',
+    'crlf': b'Date,Label,Amount\r\n01/02/2026,"cr\r\nlf",1.5\r\n02/02/2026,plain,-2\r\n',
+    'escaped quotes': b'a,"say ""hi""\nthere",b\n"""",x,"\n"\n',
+    # A quote inside an unquoted field does not open a quoted field
+    'stray quote': b'a,5" x\n"multi\nline",b\nc,d"\n',
+    'no final newline': b'a,"b\nc"\nd,e',
+}
+
+
+@tagged('post_install', '-at_install')
+class TestCsvChunks(BaseCase):
+
+    def _rows(self, data, delimiter=','):
+        return list(csv.reader(io.StringIO(data.decode(), newline=''), delimiter=delimiter))
+
+    def _check(self, data, delimiter=','):
+        expected = self._rows(data, delimiter)
+        for chunk_size in range(1, len(data) + 1):
+            chunks = list(csv_parallel.iter_csv_chunks(io.BytesIO(data), '"', delimiter, chunk_size=chunk_size))
+            self.assertEqual(b''.join(chunks), data)
+            rows = [row for chunk in chunks for row in self._rows(chunk, delimiter)]
+            self.assertEqual(rows, expected, f"chunk size {chunk_size}: {chunks}")
+
+    def test_samples(self):
+        for name, data in SAMPLES.items():
+            with self.subTest(name):
+                self._check(data)
+
+    def test_delimiter(self):
+        # A quote only opens a field after the delimiter of the file
+        self._check(b'a;"b\nc";d\ne,"f;g\n')
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Duplicate check of the rows of a file against the existing lines of the
+# journal, by import id or by fingerprint, and across the files of a batch.
+from datetime import date
+
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+
+from ..tools.dedupe import DuplicateChecker
+
+DAY = date(2026, 1, 5)
+
+
+def _vals(amount, label='Rent', partner_id=1, import_id=False):
+    return {'date': DAY, 'amount': amount, 'payment_ref': label, 'partner_id': partner_id, 'unique_import_id': import_id}
+
+
+@tagged('post_install', '-at_install')
+class TestDedupe(BaseCase):
+
+    def test_import_id(self):
+        checker = DuplicateChecker([('1-A', DAY, 10.0, 'Rent', 1)])
+        self.assertEqual(checker.check(_vals(99.0, import_id='1-A')), 'import_id')
+        self.assertFalse(checker.check(_vals(10.0, import_id='1-B')))
+        # The same id twice in a file
+        self.assertEqual(checker.check(_vals(10.0, import_id='1-B')), 'import_id')
+
+    def test_fingerprint(self):
+        # Two existing lines flag the same transaction twice, not a third time
+        checker = DuplicateChecker([(False, DAY, 10.0, 'Rent ', 1), (False, DAY, 10.001, 'Rent', 1)])
+        self.assertEqual(checker.check(_vals(10.0)), 'fingerprint')
+        self.assertEqual(checker.check(_vals(10.0)), 'fingerprint')
+        self.assertFalse(checker.check(_vals(10.0)))
+        self.assertFalse(checker.check(_vals(10.0, partner_id=2)))
+
+    def test_add_import_ids_only(self):
+        checker = DuplicateChecker([(False, DAY, 10.0, 'Rent', 1)])
+        checker.add([('1-A', DAY, 10.0, 'Rent', 1)], fingerprints=False)
+        self.assertEqual(checker.check(_vals(10.0, import_id='1-A')), 'import_id')
+        self.assertEqual(checker.check(_vals(10.0)), 'fingerprint')
+        self.assertFalse(checker.check(_vals(10.0)))
+
+    def test_files_of_batch(self):
+        checker = DuplicateChecker(track_files=True)
+        for vals in (_vals(10.0), _vals(20.0, import_id='1-A')):
+            self.assertFalse(checker.check(vals))
+            checker.record(vals)
+        # Rows of the file only count for the next files
+        self.assertFalse(checker.check(_vals(10.0)))
+        checker.end_file()
+        self.assertEqual(checker.check(_vals(10.0)), 'fingerprint')
+        self.assertEqual(checker.check(_vals(20.0, import_id='1-A')), 'import_id')
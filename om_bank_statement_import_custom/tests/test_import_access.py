@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Imports run by accounting users without administration rights, whose access
+# to the import history is read and create only, and to background jobs read
+# only, for their own jobs.
+import base64
+
+from odoo.exceptions import AccessError
+from odoo.tests import new_test_user, tagged
+
+from ..tools import statement_generator
+from .common import BankStatementImportCommon
+
+
+@tagged('post_install', '-at_install')
+class TestImportAccess(BankStatementImportCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.journal = cls.company_data['default_journal_bank']
+        cls.accountant = new_test_user(
+            cls.env, login='bank_statement_accountant', groups='base.group_user,account.group_account_user',
+            company_id=cls.env.company.id, company_ids=[(6, 0, cls.env.company.ids)])
+        data = statement_generator.generate('csv', rows=20, partners=5)
+        # A last row whose date does not parse
+        last_row = data.decode().splitlines()[-1]
+        cls.data = data + f"not a date,{last_row.split(',', 1)[1]}\r\n".encode()
+
+        wizard = cls._create_import_wizard(
+            cls.journal, 'statement.csv', cls.data, on_error='skip', duplicate_handling='none', create_partner=False)
+        cls.profile = cls.env['om.bank.statement.import.profile'].create(dict(
+            cls.env['om.bank.statement.import.profile']._prepare_from_wizard(wizard), name='Access Test'))
+
+    def test_import_file_with_rejected_row(self):
+        profile = self.profile.with_user(self.accountant)
+        result = profile.import_file(file_name='statement.csv', file_data=base64.b64encode(self.data).decode())
+
+        self.assertEqual(result['state'], 'done', result['error'])
+        self.assertEqual(result['rows_valid'], 20)
+        self.assertEqual(result['rows_skipped'], 1)
+        history = self.env['om.bank.statement.import.history'].browse(result['history_id'])
+        rejects = self.env['ir.attachment'].browse(result['reject_attachment_id'])
+        self.assertEqual(history.reject_attachment_ids, rejects)
+        self.assertEqual((rejects.res_model, rejects.res_id), (history._name, history.id))
+        # The user reads the reject file of the import
+        self.assertIn(b'not a date', rejects.with_user(self.accountant).raw)
+
+    def test_background_job_of_user(self):
+        Import = self.env['om.bank.statement.import'].with_user(self.accountant)
+        attachment = Import._stage_content(self.data, 'statement.csv')
+        wizard = self.profile.with_user(self.accountant)._get_import_wizard(self.journal, 'statement.csv', attachment)
+        action = wizard.import_file_async()
+
+        Job = self.env['om.bank.statement.import.job'].with_user(self.accountant)
+        job = Job.browse(action['res_id'])
+        self.assertEqual(job.user_id, self.accountant)
+        self.assertEqual(Job.search([]), job)
+        # Jobs run as their user, who cannot write them
+        with self.assertRaises(AccessError):
+            job.write({'user_id': self.env.ref('base.user_admin').id})
+        with self.assertRaises(AccessError):
+            Job.create({'name': 'statement.csv', 'journal_id': self.journal.id})
+        other = new_test_user(self.env, login='bank_statement_other', groups='base.group_user,account.group_account_user')
+        self.assertFalse(Job.with_user(other).search([('id', '=', job.id)]))
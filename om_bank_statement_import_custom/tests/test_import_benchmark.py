@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# Benchmarks of the import pipeline, not part of the standard test run:
+#
+#   odoo-bin -d <db> -i om_bank_statement_import_custom --test-tags bank_statement_import_benchmark
+#
+# Each phase (decode, parse, partner resolution, extract, ORM create) is timed
+# and its peak Python memory traced on synthetic statements, as are whole CSV
+# imports parsed sequentially and by worker processes, and the conversion of
+# the rows by the compiled row converter against _extract_values(). Results are
+# compared per 1000 rows to the baselines in benchmark_baselines.json, a
+# phase slower or bigger than its baseline by more than the tolerance fails.
+# The first run, or a run with BANK_IMPORT_BENCHMARK_UPDATE=1, records the
+# baselines of the machine instead.
+#
+# Environment:
+#   BANK_IMPORT_BENCHMARK_ROWS       rows per statement (default 10000)
+#   BANK_IMPORT_BENCHMARK_TOLERANCE  allowed ratio to the baseline (default 1.5)
+#   BANK_IMPORT_BENCHMARK_BASELINES  baseline file (default next to this file)
+#   BANK_IMPORT_BENCHMARK_WORKERS    parsing processes of the parallel import (default 4)
+import io
+import json
+import logging
+import os
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import openpyxl
+
+from odoo.tests import tagged
+
+from ..tools import statement_generator
+from .common import BankStatementImportCommon
+
+_logger = logging.getLogger(__name__)
+
+ROWS = int(os.environ.get('BANK_IMPORT_BENCHMARK_ROWS', 10000))
+TOLERANCE = float(os.environ.get('BANK_IMPORT_BENCHMARK_TOLERANCE', 1.5))
+UPDATE = os.environ.get('BANK_IMPORT_BENCHMARK_UPDATE') == '1'
+BASELINES = os.environ.get('BANK_IMPORT_BENCHMARK_BASELINES') or os.path.join(
+    os.path.dirname(__file__), 'benchmark_baselines.json')
+# Below these, differences are noise rather than regressions
+MIN_SECONDS = 0.05
+WORKERS = int(os.environ.get('BANK_IMPORT_BENCHMARK_WORKERS', 4))
+MIN_BYTES = 1024 * 1024
+
+
+@tagged('-standard', 'post_install', '-at_install', 'bank_statement_import_benchmark')
+class TestImportBenchmark(BankStatementImportCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.journal = cls.company_data['default_journal_bank']
+        # Foreign currency rows only resolve to active currencies
+        (cls.env.ref('base.USD') | cls.env.ref('base.GBP')).active = True
+
+    def _measure(self, results, phase, func):
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = func()
+        finally:
+            seconds = time.perf_counter() - start
+            _size, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        results[phase] = {
+            'seconds': seconds * 1000 / ROWS,
+            'peak_bytes': peak * 1000 / ROWS,
+        }
+        _logger.info("%s: %.3fs, peak %.1f MiB for %d rows", phase, seconds, peak / 1024 / 1024, ROWS)
+        return result
+
+    def _get_wizard(self, file_name, data, **options):
+        return self._create_import_wizard(self.journal, file_name, data, **options)
+
+    def _run_pipeline(self, name, wizard, decode):
+        results = {}
+        mapping = wizard._get_mapping()
+        with wizard._open_staged_file() as stream:
+            self._measure(results, 'decode', lambda: decode(stream))
+            rows = self._measure(results, 'parse', lambda: list(wizard._iter_numbered_rows(stream)))
+        self.assertEqual(len(rows), ROWS)
+
+        lookups, _keys = self._measure(results, 'partners', lambda: wizard._prefetch_related_records(iter(rows), mapping))
+        convert = wizard._get_row_converter(mapping, **lookups)
+        lines_vals = self._measure(results, 'extract', lambda: [convert(row) for _row_idx, row in rows])
+
+        def create():
+            statement = self.env['account.bank.statement'].create(wizard._prepare_statement_vals())
+            batch_size = wizard.batch_size or ROWS
+            for start in range(0, len(lines_vals), batch_size):
+                wizard._create_statement_lines(statement, lines_vals[start:start + batch_size])
+            return statement
+
+        statement = self._measure(results, 'create', create)
+        self.assertEqual(len(statement.line_ids), ROWS)
+        self._check_baselines(name, results)
+
+    def test_benchmark_csv(self):
+        data = statement_generator.generate(
+            'csv', rows=ROWS, partners=max(ROWS // 20, 1), currencies=('USD', 'GBP'), foreign_ratio=0.1,
+            date_format='%d.%m.%Y', decimal_sep=',', thousand_sep='.', delimiter=';')
+        wizard = self._get_wizard(
+            'benchmark.csv', data, separator='semicolon', date_format='eu_dot',
+            float_decimal_separator='comma', float_thousand_separator='dot')
+
+        def decode(stream):
+            stream.seek(0)
+            text = io.TextIOWrapper(stream, encoding=wizard.encoding, newline='')
+            try:
+                while text.read(1024 * 1024):
+                    pass
+            finally:
+                text.detach()
+
+        self._run_pipeline('csv', wizard, decode)
+
+    def test_benchmark_csv_parallel(self):
+        # The same file imported whole, parsed in this process then by
+        # workers, which also collect the lookup keys
+        data = statement_generator.generate(
+            'csv', rows=ROWS, partners=max(ROWS // 20, 1), currencies=('USD', 'GBP'), foreign_ratio=0.1)
+        results = {}
+        for phase, workers in (('sequential', 0), ('parallel', WORKERS)):
+            wizard = self._get_wizard('benchmark.csv', data, duplicate_handling='none')
+            with patch.object(type(wizard), '_get_parse_workers', return_value=workers), \
+                    wizard._open_staged_file() as stream:
+                statements = self._measure(results, phase, lambda: wizard._import_csv(stream, wizard._get_mapping()))
+            self.assertEqual(len(statements.line_ids), ROWS)
+        self._check_baselines('csv_parallel', results)
+
+    def test_benchmark_extract(self):
+        # Rows converted by a converter compiled once for the import, against
+        # _extract_values() reading the wizard options for every row
+        data = statement_generator.generate(
+            'csv', rows=ROWS, partners=max(ROWS // 20, 1), currencies=('USD', 'GBP'), foreign_ratio=0.1)
+        wizard = self._get_wizard('benchmark.csv', data)
+        mapping = wizard._get_mapping()
+        with wizard._open_staged_file() as stream:
+            rows = [row for _row_idx, row in wizard._iter_numbered_rows(stream)]
+        lookups, _keys = wizard._prefetch_related_records(enumerate(rows), mapping)
+
+        results = {}
+        per_row = self._measure(results, 'extract_values', lambda: [
+            wizard._extract_values(row, mapping, **lookups) for row in rows])
+        convert = wizard._get_row_converter(mapping, **lookups)
+        converted = self._measure(results, 'row_converter', lambda: [convert(row) for row in rows])
+        self.assertEqual(converted, per_row)
+        self.assertLess(results['row_converter']['seconds'], results['extract_values']['seconds'])
+        self._check_baselines('extract', results)
+
+    def test_benchmark_xlsx(self):
+        data = statement_generator.generate(
+            'xlsx', rows=ROWS, partners=max(ROWS // 20, 1), currencies=('USD', 'GBP'), foreign_ratio=0.1)
+        wizard = self._get_wizard('benchmark.xlsx', data)
+
+        def decode(stream):
+            # Unzipping and opening the workbook, rows are read in the parse phase
+            stream.seek(0)
+            openpyxl.load_workbook(stream, read_only=True, data_only=True).close()
+
+        self._run_pipeline('xlsx', wizard, decode)
+
+    def _check_baselines(self, name, results):
+        baselines = {}
+        if os.path.exists(BASELINES):
+            with open(BASELINES) as baseline_file:
+                baselines = json.load(baseline_file)
+
+        regressions = []
+        for phase, measured in results.items():
+            baseline = baselines.get(name, {}).get(phase)
+            if UPDATE or not baseline:
+                baselines.setdefault(name, {})[phase] = measured
+                continue
+            for metric, floor in (('seconds', MIN_SECONDS), ('peak_bytes', MIN_BYTES)):
+                if measured[metric] > baseline[metric] * TOLERANCE \
+                        and (measured[metric] - baseline[metric]) * ROWS / 1000 > floor:
+                    regressions.append(
+                        f"{name} {phase} {metric}: {measured[metric]:.4g} per 1000 rows, "
+                        f"baseline {baseline[metric]:.4g}")
+
+        if not regressions:
+            with open(BASELINES, 'w') as baseline_file:
+                json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+        self.assertFalse(regressions, "Benchmark regressions:\n" + "\n".join(regressions))
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Statement lines matched to the open items by reference, partner or amount,
+# an item matching one line at most.
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+
+from ..tools.matching import OpenItemIndex, normalize_reference, reference_tokens
+
+EUR, USD = 1, 2
+
+
+@tagged('post_install', '-at_install')
+class TestMatching(BaseCase):
+
+    def test_references(self):
+        self.assertEqual(normalize_reference('inv/2026/0012'), 'INV20260012')
+        self.assertFalse(normalize_reference('Rent'))
+        self.assertFalse(normalize_reference('A1'))
+        # Up to three consecutive words, written apart or not
+        tokens = reference_tokens('Payment INV 2026 0012, thanks')
+        self.assertIn('INV20260012', tokens)
+        self.assertIn('0012', tokens)
+        self.assertNotIn('PAYMENTINV20260012', tokens)
+        self.assertFalse(reference_tokens('Rent January'))
+
+    def test_match(self):
+        index = OpenItemIndex([
+            (10, 100, EUR, 50.0, ['INV/2026/0001']),
+            (11, 100, EUR, 50.0, ['INV/2026/0002']),
+            (12, 200, EUR, 50.0, []),
+            (13, 300, USD, 50.0, []),
+            (14, 300, EUR, 75.004, []),
+        ])
+        self.assertEqual(index.match(EUR, 50.0, 100, 'Invoice INV/2026/0002'), (11, 'reference'))
+        # Used up, the reference no longer gives an item
+        self.assertEqual(index.match(EUR, 50.0, 100, 'INV/2026/0002'), (10, 'partner'))
+        self.assertEqual(index.match(EUR, 50.0), (12, 'amount'))
+        self.assertEqual(index.match(EUR, 50.0), (False, False))
+        self.assertEqual(index.match(EUR, 75.0, label='Rent'), (14, 'amount'))
+        self.assertEqual(index.match(USD, 75.0), (False, False))
+        self.assertEqual(len(index), 1)
+
+    def test_ambiguous(self):
+        index = OpenItemIndex([(10, 100, EUR, 50.0, []), (11, 100, EUR, 50.0, [])], digits={EUR: 2})
+        self.assertEqual(index.match(EUR, 50.0, 100), (False, False))
+        self.assertEqual(len(index), 2)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Partner names of a statement matched on the normalised names of the
+# partners, then by trigram similarity.
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+
+from ..tools.partner_matcher import PartnerMatcher, normalize_name
+
+PARTNERS = [
+    (1, 'ACME Corporation'),
+    (2, 'Société Générale S.A.'),
+    (3, 'Müller GmbH'),
+    (4, 'Acme Corp.'),
+    (5, 'Johnson & Johnson Ltd'),
+]
+
+
+@tagged('post_install', '-at_install')
+class TestPartnerMatcher(BaseCase):
+
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name('Société Générale S.A.'), 'societe generale s a')
+        self.assertEqual(normalize_name('SEPA TRF Müller GmbH 2026-01 INV123'), 'muller')
+        # A name made of legal forms only is kept
+        self.assertEqual(normalize_name('Co Ltd'), 'co ltd')
+        self.assertEqual(normalize_name(None), '')
+
+    def test_exact(self):
+        matcher = PartnerMatcher(PARTNERS)
+        # The first partner wins a shared name
+        self.assertEqual(matcher.match('acme corp'), 1)
+        self.assertEqual(matcher.match('CARD PAYMENT MULLER'), 3)
+        self.assertFalse(matcher.match('1234'))
+
+    def test_similar(self):
+        matcher = PartnerMatcher(PARTNERS)
+        self.assertEqual(matcher.match('Jonhson & Johnson'), 5)
+        self.assertEqual(matcher.match('Societe Generale'), 2)
+        self.assertFalse(matcher.match('Globex'))
+        self.assertFalse(PartnerMatcher(PARTNERS, threshold=1.0).match('Jonhson & Johnson'))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# Options of a CSV file detected from its first bytes: encoding, separator
+# and quote, header row, date and number formats.
+import codecs
+
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+
+from ..tools import sniffing
+
+
+@tagged('post_install', '-at_install')
+class TestSniffing(BaseCase):
+
+    def test_detect_encoding(self):
+        text = "Date;Label\n05.01.2026;Café\n"
+        self.assertEqual(sniffing.detect_encoding(codecs.BOM_UTF8 + text.encode()), ('utf-8-sig', True))
+        self.assertEqual(sniffing.detect_encoding(text.encode('utf-16-le')), ('utf-16-le', True))
+        self.assertEqual(sniffing.detect_encoding(text.encode('utf-16-be')), ('utf-16-be', True))
+        self.assertEqual(sniffing.detect_encoding(text.encode()), ('utf-8', True))
+        # ASCII fits any encoding, the other single bytes are not UTF-8
+        self.assertEqual(sniffing.detect_encoding(b"Date,Label\n"), ('utf-8', False))
+        self.assertEqual(sniffing.detect_encoding(text.encode('windows-1252')), ('windows-1252', False))
+        # A multibyte character cut at the end of the sample
+        self.assertEqual(sniffing.detect_encoding(text.encode()[:-2]), ('utf-8', True))
+
+    def test_number_separators(self):
+        self.assertEqual(sniffing.number_separators('1,234.50'), ('dot', 'comma'))
+        self.assertEqual(sniffing.number_separators('-1.234,50'), ('comma', 'dot'))
+        self.assertEqual(sniffing.number_separators('1 234,50'), ('comma', 'space'))
+        self.assertEqual(sniffing.number_separators('1.234.567'), (None, 'dot'))
+        self.assertEqual(sniffing.number_separators('1,234'), (None, None))
+        self.assertEqual(sniffing.number_separators('12'), (None, None))
+
+    def test_date_formats_of(self):
+        self.assertEqual(sniffing.date_formats_of(['2026-01-05', '2026-12-31']), ['iso_dash'])
+        # Days up to 12 fit both orders, the day first one comes first
+        self.assertEqual(sniffing.date_formats_of(['05/01/2026']), ['eu_slash', 'us_slash'])
+        self.assertEqual(sniffing.date_formats_of(['05/01/2026', '12/31/2026']), ['us_slash'])
+        self.assertEqual(sniffing.date_formats_of(['not a date']), [])
+
+    def test_sniff_csv(self):
+        head = (
+            "Date;Label;Amount\n"
+            "05.01.2026;\"Shop; Co\";-1.234,50\n"
+            "31.01.2026;Salary;2.000,00\n"
+        ).encode('windows-1252')
+        self.assertEqual(sniffing.sniff_csv(head), {
+            'encoding': 'utf-8',
+            'separator': 'semicolon',
+            'quote_char': '"',
+            'has_header': True,
+            'date_format': 'eu_dot',
+            'float_decimal_separator': 'comma',
+            'float_thousand_separator': 'dot',
+        })
+
+    def test_sniff_csv_no_header(self):
+        head = b"2026-01-05,Shop,-12.50\n2026-01-06,Salary,2000.00\n"
+        options = sniffing.sniff_csv(head)
+        self.assertEqual(options['separator'], 'comma')
+        self.assertFalse(options['has_header'])
+        self.assertEqual(options['date_format'], 'iso_dash')
+        self.assertEqual(options['float_decimal_separator'], 'dot')
+
+    def test_sniff_csv_encoding(self):
+        head = "Date,Label\n2026-01-05,Café\n".encode('windows-1252')
+        # An encoding chosen before is kept when it decodes the sample
+        self.assertNotIn('encoding', sniffing.sniff_csv(head, encoding='latin1'))
+        self.assertEqual(sniffing.sniff_csv(head, encoding='utf-8')['encoding'], 'windows-1252')
+        # but a certain detection wins
+        self.assertEqual(sniffing.sniff_csv(codecs.BOM_UTF8 + head, encoding='latin1')['encoding'], 'utf-8-sig')
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# Readers of the structured statement formats on small samples: rows and
+# their signs, entities, batched CAMT entries and OFX read chunk by chunk.
+import io
+from datetime import date
+
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+
+from ..tools import statement_formats
+
+CAMT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">
+  <BkToCstmrStmt>
+    <Stmt>
+      <Id>STMT-1</Id>
+      <Ntry>
+        <Amt Ccy="EUR">100.00</Amt>
+        <CdtDbtInd>CRDT</CdtDbtInd>
+        <Sts>BOOK</Sts>
+        <BookgDt><Dt>2026-01-05</Dt></BookgDt>
+        <AcctSvcrRef>E1</AcctSvcrRef>
+        <NtryDtls>
+          <TxDtls>
+            <RltdPties>
+              <Dbtr><Nm>Shop &amp; Co</Nm></Dbtr>
+              <DbtrAcct><Id><IBAN>NL02RABO0123456789</IBAN></Id></DbtrAcct>
+            </RltdPties>
+            <RmtInf><Ustrd>Invoice 1</Ustrd></RmtInf>
+          </TxDtls>
+        </NtryDtls>
+      </Ntry>
+      <Ntry>
+        <Amt Ccy="EUR">50.00</Amt>
+        <CdtDbtInd>CRDT</CdtDbtInd>
+        <RvslInd>true</RvslInd>
+        <Sts>BOOK</Sts>
+        <BookgDt><Dt>2026-01-06</Dt></BookgDt>
+        <AcctSvcrRef>E2</AcctSvcrRef>
+        <AddtlNtryInf>Reversal of a direct debit</AddtlNtryInf>
+      </Ntry>
+      <Ntry>
+        <Amt Ccy="EUR">30.00</Amt>
+        <CdtDbtInd>DBIT</CdtDbtInd>
+        <Sts>BOOK</Sts>
+        <BookgDt><Dt>2026-01-07</Dt></BookgDt>
+        <AcctSvcrRef>E3</AcctSvcrRef>
+        <NtryDtls>
+          <TxDtls>
+            <Refs><AcctSvcrRef>T1</AcctSvcrRef></Refs>
+            <Amt Ccy="EUR">10.00</Amt>
+            <RltdPties><Cdtr><Nm>Supplier A</Nm></Cdtr></RltdPties>
+          </TxDtls>
+          <TxDtls>
+            <Refs><AcctSvcrRef>T2</AcctSvcrRef></Refs>
+            <Amt Ccy="EUR">20.00</Amt>
+            <RltdPties><Cdtr><Nm>Supplier B</Nm></Cdtr></RltdPties>
+          </TxDtls>
+        </NtryDtls>
+      </Ntry>
+      <Ntry>
+        <Amt Ccy="EUR">5.00</Amt>
+        <CdtDbtInd>DBIT</CdtDbtInd>
+        <Sts>PDNG</Sts>
+        <BookgDt><Dt>2026-01-08</Dt></BookgDt>
+      </Ntry>
+    </Stmt>
+  </BkToCstmrStmt>
+</Document>
+"""
+
+OFX = b"""OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+SECURITY:NONE
+ENCODING:USASCII
+CHARSET:1252
+COMPRESSION:NONE
+OLDFILEUID:NONE
+NEWFILEUID:NONE
+
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>EUR
+<BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260105120000[0:GMT]<TRNAMT>-12.50<FITID>F1
+<NAME>Shop &amp; Co<MEMO>Card &lt;1234&gt;
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260106<TRNAMT>100.00<FITID>F2<NAME>ACME
+</BANKTRANLIST>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+MT940 = b""":20:STARTUMS
+:25:NL91ABNA0417164300
+:28C:1/1
+:60F:C260101EUR1000,00
+:61:2601050105C100,00NTRFNONREF//B1
+:86:/NAME/ACME BV/IBAN/NL02RABO0123456789/REMI/Invoice 1
+:61:2601060106RC25,00NTRFREF2
+:86:Reversal of a credit
+:61:2601070107D10,50NMSCNONREF
+:62F:C260107EUR1064,50
+-
+"""
+
+
+@tagged('post_install', '-at_install')
+class TestStatementFormats(BaseCase):
+
+    def test_sniff_format(self):
+        self.assertEqual(statement_formats.sniff_format(CAMT[:statement_formats.SNIFF_SIZE]), 'camt')
+        self.assertEqual(statement_formats.sniff_format(OFX[:statement_formats.SNIFF_SIZE]), 'ofx')
+        self.assertEqual(statement_formats.sniff_format(MT940[:statement_formats.SNIFF_SIZE]), 'mt940')
+        self.assertFalse(statement_formats.sniff_format(b"Date,Amount\n2026-01-05,10.00\n"))
+
+    def test_camt(self):
+        rows = list(statement_formats.iter_camt_rows(io.BytesIO(CAMT)))
+        self.assertEqual(rows, [
+            [date(2026, 1, 5), 'Invoice 1', 'Shop & Co', 'NL02RABO0123456789', 100.0, '', None, 'E1'],
+            # A credit reversing a debit comes in
+            [date(2026, 1, 6), 'Reversal of a direct debit', '', '', 50.0, '', None, 'E2'],
+            # One row per transaction of a batched entry, with their own references
+            [date(2026, 1, 7), '', 'Supplier A', '', -10.0, '', None, 'T1'],
+            [date(2026, 1, 7), '', 'Supplier B', '', -20.0, '', None, 'T2'],
+        ])
+
+    def test_ofx(self):
+        rows = list(statement_formats.iter_ofx_rows(io.BytesIO(OFX)))
+        self.assertEqual(rows, [
+            [date(2026, 1, 5), 'Shop & Co Card <1234>', 'Shop & Co', '', -12.5, '', None, 'F1'],
+            [date(2026, 1, 6), 'ACME', 'ACME', '', 100.0, '', None, 'F2'],
+        ])
+
+    def test_ofx_chunks(self):
+        # Tags and values cut by a chunk boundary are read whole
+        text = OFX.decode('cp1252')
+        expected = list(statement_formats._iter_ofx_tags(io.StringIO(text)))
+        for chunk_size in range(1, 64):
+            self.assertEqual(
+                list(statement_formats._iter_ofx_tags(io.StringIO(text), chunk_size=chunk_size)), expected,
+                f"chunk size {chunk_size}")
+
+    def test_mt940(self):
+        rows = list(statement_formats.iter_mt940_rows(io.BytesIO(MT940)))
+        self.assertEqual([row[4] for row in rows], [100.0, -25.0, -10.5])
+        self.assertEqual(rows[0], [
+            date(2026, 1, 5), 'Invoice 1', 'ACME BV', 'NL02RABO0123456789', 100.0, '', None, 'B1'])
+        # RC is the reversal of a credit, a debit
+        self.assertEqual(rows[1][1], 'Reversal of a credit')
+        self.assertEqual(rows[1][7], 'REF2')
+        self.assertEqual(rows[2][7], '')
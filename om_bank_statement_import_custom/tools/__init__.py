@@ -0,0 +1,10 @@
+from . import parsing
+from . import converter
+from . import columnar
+from . import csv_parallel
+from . import partner_matcher
+from . import dedupe
+from . import statement_generator
+from . import profiling
+from . import matching
+from . import sniffing
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+# Row converter compiled once per import from the wizard mapping and options,
+# so converting a row does not touch recordset fields or rebuild lookups.
+from datetime import date, datetime
+
+from odoo.exceptions import UserError
+
+from .parsing import DEFAULT_DATE_FORMAT
+
+
+class RowConverter:
+    __slots__ = (
+        'date_idx', 'label_idx', 'partner_idx', 'amount_idx', 'currency_code_idx', 'amount_currency_idx',
+        'account_idx', 'import_id_idx', 'date_fmt', 'date_cache', 'float_table', 'col_names', 'journal_id', 'today',
+        'partner_map', 'currency_map', 'account_map',
+    )
+
+    def __init__(self, mapping, date_fmt, thousand_sep, decimal_sep, col_names, journal_id, today,
+                 partner_map=None, currency_map=None, account_map=None):
+        self.date_idx = mapping.get('date')
+        self.label_idx = mapping.get('payment_ref')
+        self.partner_idx = mapping.get('partner')
+        self.amount_idx = mapping.get('amount')
+        self.currency_code_idx = mapping.get('foreign_currency_code')
+        self.amount_currency_idx = mapping.get('amount_currency')
+        self.account_idx = mapping.get('account_number')
+        self.import_id_idx = mapping.get('unique_import_id')
+        self.date_fmt = date_fmt
+        # A statement has few distinct dates, strptime runs once per distinct value
+        self.date_cache = {}
+        # Same result as removing the thousands separator, then replacing the
+        # decimal separator by a dot, in one str.translate call
+        float_table = {}
+        if decimal_sep != '.':
+            float_table[ord(decimal_sep)] = '.'
+        if thousand_sep:
+            float_table[ord(thousand_sep)] = None
+        self.float_table = float_table
+        self.col_names = col_names
+        self.journal_id = journal_id
+        self.today = today
+        # Kept by reference: lookups resolved chunk by chunk are added to them
+        self.partner_map = {} if partner_map is None else partner_map
+        self.currency_map = {} if currency_map is None else currency_map
+        self.account_map = {} if account_map is None else account_map
+
+    def parse_float(self, value):
+        if not value:
+            return 0.0
+        if isinstance(value, (float, int)):
+            return float(value)
+        try:
+            return float(str(value).strip().translate(self.float_table))
+        except ValueError:
+            raise ValueError("Invalid Float")
+
+    def parse_date(self, value):
+        if not value:
+            return False
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        result = self.date_cache.get(value)
+        if result is None:
+            result = self.date_cache[value] = self._strptime(str(value).strip())
+        return result
+
+    def _strptime(self, value):
+        try:
+            return datetime.strptime(value, self.date_fmt).date()
+        except ValueError:
+            # Fallback to standard ISO
+            try:
+                return datetime.strptime(value, DEFAULT_DATE_FORMAT).date()
+            except ValueError:
+                raise ValueError("Invalid Date")
+
+    def convert_date(self, row):
+        date_idx = self.date_idx
+        return self.convert_date_value(row[date_idx] if date_idx < len(row) else False)
+
+    def convert_date_value(self, date_val):
+        try:
+            return self.parse_date(date_val) or self.today
+        except ValueError as e:
+            date_idx = self.date_idx
+            col_name = self.col_names.get(date_idx, "Unknown")
+            raise UserError(f"Date Error: '{date_val}' in column '{col_name}' (Index {date_idx}) - {str(e)}")
+
+    def convert_amount(self, row):
+        amount_idx = self.amount_idx
+        return self.convert_amount_value(row[amount_idx] if amount_idx < len(row) else 0.0)
+
+    def convert_amount_value(self, amount_val):
+        try:
+            return self.parse_float(amount_val)
+        except ValueError:
+            amount_idx = self.amount_idx
+            col_name = self.col_names.get(amount_idx, "Unknown")
+            raise UserError(f"Amount Error: '{amount_val}' in column '{col_name}' (Index {amount_idx})")
+
+    def convert_amount_currency(self, row):
+        amount_currency_idx = self.amount_currency_idx
+        if amount_currency_idx is None or amount_currency_idx >= len(row):
+            return 0.0
+        try:
+            return self.parse_float(row[amount_currency_idx])
+        except ValueError:
+            return 0.0
+
+    def __call__(self, row):
+        row_len = len(row)
+
+        label_idx = self.label_idx
+        label_val = row[label_idx] if label_idx is not None and label_idx < row_len else '/'
+
+        # A known bank account identifies the partner before its name does
+        account_number = ''
+        account_idx = self.account_idx
+        if account_idx is not None and account_idx < row_len and row[account_idx]:
+            account_number = str(row[account_idx]).strip()
+        partner_id = self.account_map.get(account_number, False)
+        partner_idx = self.partner_idx
+        if not partner_id and partner_idx is not None and partner_idx < row_len:
+            partner_name = str(row[partner_idx]).strip() if row[partner_idx] else ''
+            partner_id = self.partner_map.get(partner_name, False)
+
+        vals = {
+            'date': self.convert_date(row),
+            'payment_ref': str(label_val) if label_val else '/',
+            'partner_id': partner_id,
+            'amount': self.convert_amount(row),
+            'journal_id': self.journal_id,
+        }
+        if account_number:
+            vals['account_number'] = account_number
+
+        import_id_idx = self.import_id_idx
+        if import_id_idx is not None and import_id_idx < row_len and row[import_id_idx]:
+            # unique_import_id is unique across all journals
+            vals['unique_import_id'] = f"{self.journal_id}-{str(row[import_id_idx]).strip()}"
+
+        currency_code_idx = self.currency_code_idx
+        if currency_code_idx is not None and currency_code_idx < row_len:
+            foreign_currency_id = self.currency_map.get(str(row[currency_code_idx]).strip(), False)
+            if foreign_currency_id:
+                vals['foreign_currency_id'] = foreign_currency_id
+                vals['amount_currency'] = self.convert_amount_currency(row)
+        return vals
+
+
+def partner_key(row, partner_idx, account_idx):
+    name = account = ''
+    if partner_idx is not None and partner_idx < len(row) and row[partner_idx]:
+        name = str(row[partner_idx]).strip()
+    if account_idx is not None and account_idx < len(row) and row[account_idx]:
+        account = str(row[account_idx]).strip()
+    return name, account
+
+
+class LookupKeys:
+    # Distinct values of the raw rows resolved against the database before
+    # the rows are converted: partners as (name, bank account) pairs, currency
+    # codes, and the dates and import ids bounding the duplicate check.
+    # Plain data, so parsing workers can collect them next to the rows.
+    __slots__ = (
+        'partner_idx', 'account_idx', 'currency_code_idx', 'date_idx', 'import_id_idx', 'journal_id',
+        'check_duplicates', 'partners', 'currencies', 'dates', 'import_ids',
+    )
+
+    def __init__(self, mapping, journal_id, check_duplicates):
+        self.partner_idx = mapping.get('partner')
+        self.account_idx = mapping.get('account_number')
+        self.currency_code_idx = mapping.get('foreign_currency_code')
+        self.date_idx = mapping.get('date')
+        self.import_id_idx = mapping.get('unique_import_id')
+        self.journal_id = journal_id
+        self.check_duplicates = check_duplicates
+        # Dicts keep the order the values are found in
+        self.partners = {}
+        self.currencies = {}
+        self.dates = {}
+        self.import_ids = {}
+
+    def add(self, row):
+        if self.partner_idx is not None or self.account_idx is not None:
+            self.partners.setdefault(partner_key(row, self.partner_idx, self.account_idx))
+        currency_code_idx = self.currency_code_idx
+        if currency_code_idx is not None and currency_code_idx < len(row) and row[currency_code_idx]:
+            self.currencies.setdefault(str(row[currency_code_idx]).strip())
+        if self.check_duplicates:
+            date_idx = self.date_idx
+            self.dates.setdefault(row[date_idx] if date_idx is not None and date_idx < len(row) else False)
+            import_id_idx = self.import_id_idx
+            if import_id_idx is not None and import_id_idx < len(row) and row[import_id_idx]:
+                self.import_ids.setdefault(f"{self.journal_id}-{str(row[import_id_idx]).strip()}")
+
+    def to_dict(self):
+        return {
+            'partners': list(self.partners),
+            'currencies': list(self.currencies),
+            'dates': list(self.dates),
+            'import_ids': list(self.import_ids),
+        }
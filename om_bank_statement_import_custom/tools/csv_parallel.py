@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# Parallel parsing and validation of large CSV files.
+#
+# The byte stream is cut at record boundaries (a newline outside of quotes),
+# chunks are decoded, parsed and have their date and amount columns converted
+# in worker processes, which also collect the values to look up (partners,
+# currencies, dates and import ids) so the file is parsed once. Only plain
+# data crosses the process boundary, the ORM stays in the calling process.
+import csv
+import io
+import multiprocessing
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from odoo.exceptions import UserError
+
+from .converter import LookupKeys
+
+# Encodings in which the quote character and newline are single, unambiguous bytes
+SPLITTABLE_ENCODINGS = ('utf-8', 'utf-8-sig', 'windows-1252', 'latin1')
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class RowParseError(Exception):
+    pass
+
+
+def _quoted_field_pattern(quote_char, delimiter):
+    # A quoted field as csv.reader reads it: the quote opens the field only as
+    # its first character, after a delimiter or at the start of a line (it is
+    # data anywhere else), and is escaped by doubling it inside the field. A
+    # field left open runs to the end of the data.
+    quote = re.escape(quote_char.encode('ascii'))
+    other = b'[^' + quote + b']*'
+    return re.compile(
+        b'(?:^|(?<=' + re.escape(delimiter.encode('ascii')) + b'))' + quote
+        + other + b'(?:' + quote + quote + other + b')*(?:' + quote + br'|\Z)',
+        re.M,
+    )
+
+
+def _last_boundary(data, quoted_field):
+    # Offset of the last newline of data outside of its quoted fields, -1 when
+    # there is none. data starts on a record boundary.
+    spans = [match.span() for match in quoted_field.finditer(data)]
+    end = len(data)
+    for start, stop in reversed(spans):
+        pos = data.rfind(b'\n', stop, end)
+        if pos >= 0:
+            return pos
+        end = start
+    return data.rfind(b'\n', 0, end)
+
+
+def iter_csv_chunks(stream, quote_char, delimiter=',', chunk_size=CHUNK_SIZE):
+    # Yield consecutive byte chunks of the stream that each end on a record
+    # boundary. Every chunk starts outside of a quoted field, so its quoted
+    # fields are found the way csv.reader finds them; a stray quote inside an
+    # unquoted field (5" x) does not open one.
+    quoted_field = _quoted_field_pattern(quote_char, delimiter)
+    stream.seek(0)
+    carry = b''
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            if carry:
+                yield carry
+            return
+        data = carry + block
+        pos = _last_boundary(data, quoted_field)
+        if pos < 0:
+            # No boundary yet, the record continues in the next block
+            carry = data
+            continue
+        yield data[:pos + 1]
+        carry = data[pos + 1:]
+
+
+def parse_chunk(data, options, first=False):
+    # Worker entry point. Returns the number of records in the chunk, for
+    # every non empty record (index in chunk, converted row, error message),
+    # and the lookup keys of the raw rows when options ask for them (see
+    # LookupKeys), None otherwise. The header is the first record of the
+    # first chunk.
+    reader = csv.reader(
+        io.StringIO(data.decode(options['encoding']), newline=''),
+        delimiter=options['delimiter'], quotechar=options['quotechar'],
+    )
+    converter = options['converter']
+    date_idx = converter.date_idx
+    amount_idx = converter.amount_idx
+    amount_currency_idx = converter.amount_currency_idx
+    keys = LookupKeys(**options['lookup_keys']) if options.get('lookup_keys') else None
+    skip_header = first and options.get('has_header')
+
+    results = []
+    count = 0
+    for count, row in enumerate(reader, start=1):
+        if not row or not any(row) or (skip_header and count == 1):
+            continue
+        if keys is not None:
+            keys.add(row)
+        try:
+            if date_idx < len(row):
+                row[date_idx] = converter.convert_date(row)
+            if amount_idx < len(row):
+                row[amount_idx] = converter.convert_amount(row)
+        except UserError as e:
+            results.append((count, None, str(e)))
+            continue
+        if amount_currency_idx is not None and amount_currency_idx < len(row):
+            row[amount_currency_idx] = converter.convert_amount_currency(row)
+        results.append((count, tuple(row), None))
+    return count, results, keys and keys.to_dict()
+
+
+def iter_parsed_rows(stream, options, workers, first_row=1, on_keys=None):
+    # Yield (record number, row) in file order, row being a RowParseError for
+    # records that failed validation. on_keys is called with the lookup keys
+    # of every chunk before its rows are yielded. At most two chunks per
+    # worker are in flight so memory stays bounded whatever the file size.
+    context = multiprocessing.get_context('fork')
+    offset = first_row - 1
+
+    def collect(future):
+        nonlocal offset
+        count, results, keys = future.result()
+        if on_keys and keys is not None:
+            on_keys(keys)
+        for idx, row, error in results:
+            yield offset + idx, RowParseError(error) if error else row
+        offset += count
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = deque()
+        try:
+            chunks = iter_csv_chunks(stream, options['quotechar'], options['delimiter'])
+            for chunk_idx, chunk in enumerate(chunks):
+                pending.append(executor.submit(parse_chunk, chunk, options, chunk_idx == 0))
+                if len(pending) >= workers * 2:
+                    yield from collect(pending.popleft())
+            while pending:
+                yield from collect(pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Duplicate detection against the statement lines already in the journal. The
+# existing lines of the file's date range are loaded once into a hash table,
+# rows are then checked by their unique import id when the file has one, by a
+# (date, amount, label, partner) fingerprint otherwise.
+from collections import Counter
+
+
+def fingerprint(date, amount, payment_ref, partner_id, digits=2):
+    return date, round(amount or 0.0, digits), (payment_ref or '').strip(), partner_id or False
+
+
+class DuplicateChecker:
+    __slots__ = ('existing', 'import_ids', 'digits', 'file_ids', 'file_keys')
+
+    def __init__(self, lines=(), digits=2, track_files=False):
+        # lines: (unique_import_id, date, amount, payment_ref, partner_id) of the existing lines.
+        # With track_files, the rows accepted from a file are checked against
+        # by the next files once end_file() is called, for batches of
+        # overlapping files.
+        self.digits = digits
+        self.existing = Counter()
+        self.import_ids = set()
+        self.file_ids = set()
+        self.file_keys = [] if track_files else None
+        self.add(lines)
+
+    def add(self, lines, fingerprints=True):
+        # Add existing lines. Without fingerprints only their import ids are
+        # added, for lines whose fingerprint was counted already.
+        for import_id, date, amount, payment_ref, partner_id in lines:
+            if import_id:
+                self.import_ids.add(import_id)
+            if fingerprints:
+                self.existing[fingerprint(date, amount, payment_ref, partner_id, self.digits)] += 1
+
+    def check(self, vals):
+        # Return 'import_id' when the transaction is known by its import id,
+        # 'fingerprint' when an existing line looks the same, False otherwise.
+        import_id = vals.get('unique_import_id')
+        if import_id:
+            if import_id in self.import_ids or import_id in self.file_ids:
+                return 'import_id'
+            # The same id twice in the file is a duplicate as well
+            self.file_ids.add(import_id)
+            return False
+        key = fingerprint(vals['date'], vals['amount'], vals['payment_ref'], vals['partner_id'], self.digits)
+        # Every existing line stands for one row at most, so a transaction
+        # legitimately repeated in the file is only flagged as many times as
+        # it was imported before
+        count = self.existing.get(key)
+        if count:
+            self.existing[key] = count - 1
+            return 'fingerprint'
+        return False
+
+    def record(self, vals):
+        # Remember a row of the current file that is imported
+        if self.file_keys is not None and not vals.get('unique_import_id'):
+            self.file_keys.append(
+                fingerprint(vals['date'], vals['amount'], vals['payment_ref'], vals['partner_id'], self.digits))
+
+    def end_file(self):
+        # Rows of the file just imported become existing lines for the next files
+        self.import_ids |= self.file_ids
+        self.file_ids = set()
+        if self.file_keys:
+            self.existing.update(self.file_keys)
+            self.file_keys = []
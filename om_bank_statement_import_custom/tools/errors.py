@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Bounded collection of the rows rejected by an import. Errors are counted by
+# category ("Date Error in column 'Date'"), only the first examples of each
+# are kept for the notification or log, and every rejected row is streamed
+# with its row number and reason to a CSV file on disk. Memory and message
+# size do not grow with the number of errors.
+import csv
+import io
+import re
+import tempfile
+from collections import Counter
+
+MAX_EXAMPLES = 5
+# Categories beyond this many are counted under OTHER_CATEGORY
+MAX_CATEGORIES = 50
+OTHER_CATEGORY = 'Other errors'
+
+# Messages of RowConverter: "Date Error: '32/01' in column 'Date' (Index 0) - Invalid Date"
+COLUMN_ERROR = re.compile(r"^(?P<kind>[\w ]+ Error): '.*' in column '(?P<column>[^']*)'")
+QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+
+
+def error_category(message):
+    match = COLUMN_ERROR.match(message)
+    if match:
+        return f"{match['kind']} in column '{match['column']}'"
+    # Values quoted in the message differ from row to row
+    category = QUOTED.sub('…', message.splitlines()[0] if message else '').strip()
+    return category[:100] or 'Error'
+
+
+class ErrorCollector:
+    __slots__ = ('max_examples', 'counts', 'examples', 'rejected', 'reject_file', 'reject_text', 'reject_writer')
+
+    def __init__(self, header=(), max_examples=MAX_EXAMPLES, state=None):
+        # header: column names of the file, written after the row number and
+        # error of the reject file. state: to_dict() of a previous collector
+        # of the same import, for imports running in several transactions;
+        # the counters go on, each collector has its own reject file.
+        self.max_examples = max_examples
+        self.counts = Counter(state['counts']) if state else Counter()
+        self.examples = {category: list(examples) for category, examples in state['examples'].items()} \
+            if state else {}
+        # Rows written to the reject file of this collector
+        self.rejected = 0
+        self.reject_file = tempfile.TemporaryFile()
+        self.reject_text = io.TextIOWrapper(self.reject_file, encoding='utf-8', newline='')
+        self.reject_writer = csv.writer(self.reject_text)
+        self.reject_writer.writerow(['Row', 'Error'] + list(header))
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def add(self, row_number, message, row=None):
+        category = error_category(message)
+        if category not in self.counts and len(self.counts) >= MAX_CATEGORIES:
+            category = OTHER_CATEGORY
+        self.counts[category] += 1
+        examples = self.examples.setdefault(category, [])
+        if len(examples) < self.max_examples:
+            examples.append(f"Row {row_number}: {message}")
+        self.reject_writer.writerow(
+            [row_number, message] + ['' if cell is None else str(cell) for cell in row or ()])
+        self.rejected += 1
+
+    def report_lines(self):
+        # Counters by category, most frequent first, with their examples
+        lines = []
+        for category, count in self.counts.most_common():
+            lines.append(f"{category}: {count} row{'s' if count > 1 else ''}")
+            examples = self.examples.get(category, [])
+            lines += [f"  {example}" for example in examples]
+            if count > len(examples):
+                lines.append(f"  … and {count - len(examples)} more")
+        return lines
+
+    def get_reject_content(self):
+        # CSV content of the rows rejected by this collector
+        self.reject_text.flush()
+        self.reject_file.seek(0)
+        return self.reject_file.read()
+
+    def to_dict(self):
+        return {'counts': dict(self.counts), 'examples': self.examples}
+
+    def close(self):
+        self.reject_text.close()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# Matching of imported statement lines against the open receivable and payable
+# items of the company. The open items are loaded once and indexed in hash
+# tables by amount, by partner and amount, and by the normalised references of
+# their entry (number, reference, payment reference); every line is then
+# matched with a few lookups. A line only matches an item of its transaction
+# currency for the exact residual amount, and an item matches one line at most.
+import re
+
+NON_ALNUM = re.compile(r'[^0-9A-Z]')
+WORD_SEPARATORS = re.compile(r'[\s,;:]+')
+# References shorter than this, or without a digit, are too common to tell
+# an invoice apart ("INV", "2024", "Rent")
+MIN_REFERENCE_LENGTH = 4
+# Consecutive words of a label tried as one reference ("INV 2024 0012")
+MAX_REFERENCE_WORDS = 3
+
+
+def normalize_reference(value):
+    reference = NON_ALNUM.sub('', (value or '').upper())
+    if len(reference) < MIN_REFERENCE_LENGTH or not any(char.isdigit() for char in reference):
+        return False
+    return reference
+
+
+def reference_tokens(label):
+    # Normalised references a bank label may contain
+    words = [word for word in WORD_SEPARATORS.split((label or '').upper()) if word]
+    tokens = set()
+    for size in range(1, MAX_REFERENCE_WORDS + 1):
+        for start in range(len(words) - size + 1):
+            token = normalize_reference(''.join(words[start:start + size]))
+            if token:
+                tokens.add(token)
+    return tokens
+
+
+class OpenItemIndex:
+    __slots__ = ('digits', 'items', 'by_amount', 'by_partner', 'by_reference')
+
+    def __init__(self, items=(), digits=None):
+        # items: (id, partner_id, currency_id, amount_residual_currency, references)
+        # of the open items. digits: decimal places by currency id.
+        self.digits = digits or {}
+        self.items = {}
+        self.by_amount = {}
+        self.by_partner = {}
+        self.by_reference = {}
+        for item_id, partner_id, currency_id, amount, references in items:
+            key = self._amount_key(currency_id, amount)
+            tokens = {token for token in map(normalize_reference, references) if token}
+            self.items[item_id] = (partner_id, key, tokens)
+            self.by_amount.setdefault(key, set()).add(item_id)
+            if partner_id:
+                self.by_partner.setdefault((partner_id,) + key, set()).add(item_id)
+            for token in tokens:
+                self.by_reference.setdefault(token, set()).add(item_id)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _amount_key(self, currency_id, amount):
+        return currency_id, round(amount or 0.0, self.digits.get(currency_id, 2))
+
+    def match(self, currency_id, amount, partner_id=False, label=False):
+        # Return (item id, reason) of the open item matching a line, reason
+        # being 'reference', 'partner' or 'amount' by decreasing confidence,
+        # or (False, False). A lookup giving several items is ambiguous and
+        # falls through to the next one. The item matched is used up.
+        key = self._amount_key(currency_id, amount)
+        if key not in self.by_amount:
+            return False, False
+        hits = set()
+        for token in reference_tokens(label):
+            hits.update(item_id for item_id in self.by_reference.get(token, ()) if self.items[item_id][1] == key)
+        reason = 'reference'
+        if len(hits) != 1 and partner_id:
+            hits = self.by_partner.get((partner_id,) + key, ())
+            reason = 'partner'
+        if len(hits) != 1:
+            hits = self.by_amount[key]
+            reason = 'amount'
+        if len(hits) != 1:
+            return False, False
+        item_id = next(iter(hits))
+        self._use(item_id)
+        return item_id, reason
+
+    def _use(self, item_id):
+        partner_id, key, tokens = self.items.pop(item_id)
+        self._discard(self.by_amount, key, item_id)
+        if partner_id:
+            self._discard(self.by_partner, (partner_id,) + key, item_id)
+        for token in tokens:
+            self._discard(self.by_reference, token, item_id)
+
+    @staticmethod
+    def _discard(index, key, item_id):
+        ids = index[key]
+        ids.discard(item_id)
+        if not ids:
+            del index[key]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Wizard option values shared by the import wizard and the parsing worker
+# processes. Nothing here may depend on the ORM.
+
+# Map selection keys of the wizard to actual format strings / characters
+DATE_FORMATS = {
+    'iso_dash': '%Y-%m-%d',
+    'eu_slash': '%d/%m/%Y',
+    'us_slash': '%m/%d/%Y',
+    'eu_dash': '%d-%m-%Y',
+    'eu_dot': '%d.%m.%Y',
+    'iso_slash': '%Y/%m/%d',
+    'eu_short': '%d/%m/%y',
+    'us_short': '%m/%d/%y',
+}
+DEFAULT_DATE_FORMAT = '%Y-%m-%d'
+
+THOUSAND_SEPARATORS = {'comma': ',', 'dot': '.', 'space': ' '}
+DECIMAL_SEPARATORS = {'dot': '.', 'comma': ','}
+CSV_SEPARATORS = {'comma': ',', 'semicolon': ';', 'tab': '\t', 'space': ' '}
+
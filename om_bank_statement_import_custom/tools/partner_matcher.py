@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# In-memory partner name matcher, built once per import. Names are reduced to
+# a normalised key (case, accents, punctuation, legal forms and the references
+# banks append are dropped) for exact lookups, and indexed by trigram to find
+# similar names when there is no exact key.
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+LEGAL_FORMS = {
+    'ab', 'ag', 'as', 'bv', 'co', 'company', 'corp', 'corporation', 'gmbh', 'inc', 'kg', 'limited',
+    'llc', 'llp', 'ltd', 'nv', 'oy', 'plc', 'pte', 'pty', 'pvt', 'sa', 'sarl', 'sas', 'spa', 'srl',
+}
+# Words banks put around the counterparty name in the statement
+NOISE_WORDS = {
+    'card', 'ct', 'dd', 'inv', 'invoice', 'pay', 'payment', 'pmt', 'ref', 'reference', 'sepa',
+    'transfer', 'trf',
+}
+# How many candidates sharing the most selective trigrams get a full similarity check
+CANDIDATES = 10
+
+
+def normalize_name(name):
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(char for char in name if not unicodedata.combining(char)).casefold()
+    # Tokens with digits are references, dates or amounts, not part of the name
+    tokens = [token for token in re.split(r'[\W_]+', name) if token and not any(char.isdigit() for char in token)]
+    words = [token for token in tokens if token not in LEGAL_FORMS and token not in NOISE_WORDS]
+    return ' '.join(words or tokens)
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class PartnerMatcher:
+    __slots__ = ('threshold', 'by_key', 'partner_ids', 'grams', 'index', 'max_postings')
+
+    def __init__(self, partners, threshold=0.8):
+        # partners: (id, name) pairs in order of preference, the first partner
+        # wins when several share a normalised name
+        self.threshold = threshold
+        self.by_key = {}
+        self.partner_ids = []
+        self.grams = []
+        self.index = defaultdict(list)
+        for partner_id, name in partners:
+            key = normalize_name(name)
+            if not key or key in self.by_key:
+                continue
+            self.by_key[key] = partner_id
+            pos = len(self.partner_ids)
+            self.partner_ids.append(partner_id)
+            grams = trigrams(key)
+            self.grams.append(grams)
+            for gram in grams:
+                self.index[gram].append(pos)
+        # Trigrams shared by a large part of the names ("ltd", " th") do not
+        # help to find candidates and make lookups slow
+        self.max_postings = max(100, len(self.partner_ids) // 500)
+
+    def match(self, name):
+        key = normalize_name(name)
+        if not key:
+            return False
+        partner_id = self.by_key.get(key)
+        if partner_id or self.threshold >= 1.0:
+            return partner_id or False
+
+        grams = trigrams(key)
+        counts = Counter()
+        for gram in grams:
+            postings = self.index.get(gram)
+            if postings and len(postings) <= self.max_postings:
+                counts.update(postings)
+
+        best_id, best_score = False, 0.0
+        for pos, _shared in counts.most_common(CANDIDATES):
+            candidate = self.grams[pos]
+            # Dice coefficient of the two trigram sets
+            score = 2 * len(grams & candidate) / (len(grams) + len(candidate))
+            if score >= self.threshold and score > best_score:
+                best_id, best_score = self.partner_ids[pos], score
+        return best_id
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Timings and counters of an import, per phase. Phases may be entered several
+# times (one per batch of lines, per file of a batch...), their durations and
+# SQL query counts add up.
+import json
+import time
+from contextlib import contextmanager
+
+
+class ImportProfiler:
+    __slots__ = ('cr', 'started', 'query_start', 'timings', 'queries', 'counters')
+
+    def __init__(self, cr):
+        self.cr = cr
+        self.started = time.perf_counter()
+        self.query_start = cr.sql_log_count
+        self.timings = {}
+        self.queries = {}
+        self.counters = {}
+
+    def add_time(self, phase, seconds, queries=0):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+        self.queries[phase] = self.queries.get(phase, 0) + queries
+
+    def count(self, counter, value=1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    @contextmanager
+    def phase(self, phase):
+        start = time.perf_counter()
+        query_count = self.cr.sql_log_count
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start, self.cr.sql_log_count - query_count)
+
+    def timed(self, phase, iterable):
+        # Yield from iterable, adding the time spent producing the items to
+        # phase. Used for row readers, whose parsing is interleaved with the
+        # conversion of the rows.
+        iterator = iter(iterable)
+        spent = 0.0
+        perf_counter = time.perf_counter
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    spent += perf_counter() - start
+                yield item
+        finally:
+            self.add_time(phase, spent)
+
+    @property
+    def duration(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def query_count(self):
+        return self.cr.sql_log_count - self.query_start
+
+    def to_dict(self):
+        return {
+            'duration': round(self.duration, 6),
+            'queries': self.query_count,
+            'timings': {phase: round(seconds, 6) for phase, seconds in self.timings.items()},
+            'phase_queries': dict(self.queries),
+            'counters': dict(self.counters),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    def format_report(self):
+        lines = [f"Time: {self.duration:.3f}s, {self.query_count} queries"]
+        for phase, seconds in self.timings.items():
+            queries = self.queries.get(phase)
+            lines.append(f"  {phase}: {seconds:.3f}s" + (f" ({queries} queries)" if queries else ""))
+        counters = self.counters
+        if counters.get('rows_with_partner'):
+            matched = counters.get('rows_partner_found', 0)
+            lines.append(f"Partner hit rate: {matched * 100 // counters['rows_with_partner']}% "
+                         f"({matched} of {counters['rows_with_partner']} rows)")
+        for counter, value in counters.items():
+            # Row counts are part of the import summary already
+            if not counter.startswith('rows_'):
+                lines.append(f"{counter.replace('_', ' ').capitalize()}: {value}")
+        return "\n".join(lines)
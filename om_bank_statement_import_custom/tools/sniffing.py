@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+# Detection of the options of a CSV file from the first bytes of it, read
+# once: encoding (byte order mark, NUL bytes of UTF-16, then UTF-8 validity),
+# separator and text
+# delimiter (the candidates giving the most consistent number of columns),
+# header row, and the date and number formats (the supported patterns
+# checked against every value of each column of the sample). The result is a
+# dict of wizard option values, with the options that could be told only.
+import codecs
+import csv
+import io
+import re
+from collections import Counter
+from datetime import datetime
+
+from .parsing import CSV_SEPARATORS, DATE_FORMATS
+
+SNIFF_SIZE = 64 * 1024
+# Records of the sample checked for each separator
+SAMPLE_ROWS = 50
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+# Share of NUL bytes from which a sample without byte order mark is UTF-16:
+# the text of a CSV file is mostly ASCII, every other byte of it is NUL
+UTF16_NUL_RATIO = 0.2
+QUOTE_CHARS = ('"', "'")
+# Share of the values of a column that must fit a type for it to be typed
+TYPE_RATIO = 0.9
+
+NUMBER = re.compile(r'^[-+(]?\s*[^\d\s.,-]{0,3}\s*\d[\d., ]*\)?[-+]?$')
+DIGITS = re.compile(r'\d')
+
+
+def detect_encoding(head):
+    # (encoding, confident). The encoding is told by a byte order mark, the
+    # NUL bytes of UTF-16 or UTF-8 multibyte characters; ASCII text, or the
+    # bytes of a single-byte encoding, fit several encodings.
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, True
+    encoding = _detect_utf16(head)
+    if encoding:
+        return encoding, True
+    try:
+        # The prefix may end in the middle of a character
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8', not head.isascii()
+    except UnicodeDecodeError:
+        pass
+    try:
+        head.decode('windows-1252')
+        return 'windows-1252', False
+    except UnicodeDecodeError:
+        return 'latin1', False
+
+
+def _detect_utf16(head):
+    # UTF-16 without byte order mark: the NUL high bytes of ASCII characters
+    # are the second byte of each pair in little endian, the first in big endian
+    nuls = head.count(0)
+    if len(head) < 2 or nuls < len(head) * UTF16_NUL_RATIO:
+        return None
+    odd = head[1::2].count(0)
+    encoding = 'utf-16-le' if odd > nuls - odd else 'utf-16-be'
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+    except UnicodeDecodeError:
+        return None
+    return encoding
+
+
+def _fits(head, encoding, truncated):
+    # Whether a sample decodes in an encoding chosen before the detection.
+    # UTF-16 would have been detected, and anything decodes in it.
+    if not encoding or encoding.startswith('utf-16'):
+        return False
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(head, final=not truncated)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+
+def _decode_sample(head, encoding, truncated):
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(head, final=not truncated)
+    if truncated:
+        # The last record may be cut, keep complete lines only
+        end = max(text.rfind('\n'), 0)
+        text = text[:end] if end else text
+    return text
+
+
+def _parse(text, delimiter, quote_char):
+    reader = csv.reader(io.StringIO(text, newline=''), delimiter=delimiter, quotechar=quote_char)
+    rows = []
+    try:
+        for row in reader:
+            if row and any(cell.strip() for cell in row):
+                rows.append(row)
+                if len(rows) >= SAMPLE_ROWS:
+                    break
+    except csv.Error:
+        pass
+    return rows
+
+
+def _layout_score(rows):
+    # (share of the rows with the most common number of columns, columns)
+    if not rows:
+        return 0.0, 0
+    columns, count = Counter(len(row) for row in rows).most_common(1)[0]
+    if columns < 2:
+        return 0.0, columns
+    return count / len(rows), columns
+
+
+def detect_quote_char(text, delimiter):
+    # The candidate found the most often right after a separator or at the
+    # start of a line, the double quote when neither is
+    counts = {}
+    for quote_char in QUOTE_CHARS:
+        opening = re.compile(f"(?:^|{re.escape(delimiter)})[ ]*{re.escape(quote_char)}", re.M)
+        counts[quote_char] = len(opening.findall(text))
+    best = max(QUOTE_CHARS, key=lambda quote_char: counts[quote_char])
+    return best if counts[best] else QUOTE_CHARS[0]
+
+
+def detect_layout(text):
+    # (separator key, quote char, sample rows) of the candidate separator
+    # splitting the records in the most consistent number of columns. Space
+    # only wins when no other separator splits the records.
+    best = None
+    for key, delimiter in CSV_SEPARATORS.items():
+        quote_char = detect_quote_char(text, delimiter)
+        rows = _parse(text, delimiter, quote_char)
+        score = _layout_score(rows)
+        if not score[0]:
+            continue
+        rank = (delimiter != ' ',) + score
+        if best is None or rank > best[0]:
+            best = (rank, key, quote_char, rows)
+    if best is None:
+        return None, QUOTE_CHARS[0], _parse(text, ',', QUOTE_CHARS[0])
+    return best[1:]
+
+
+def date_formats_of(values):
+    # Date format keys matching every value, in the order of DATE_FORMATS
+    values = [value.strip() for value in values if value and value.strip()]
+    if not values:
+        return []
+    matching = []
+    for key, date_format in DATE_FORMATS.items():
+        try:
+            for value in values:
+                datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+        matching.append(key)
+    return matching
+
+
+def number_separators(value):
+    # ('dot'/'comma' or None, 'comma'/'dot'/'space' or None): decimal and
+    # thousands separators a number written this way implies
+    value = value.strip().strip('+-()').strip()
+    thousands = 'space' if re.search(r'\d \d', value) else None
+    last_dot, last_comma = value.rfind('.'), value.rfind(',')
+    if last_dot >= 0 and last_comma >= 0:
+        # The last one is the decimal separator
+        if last_dot > last_comma:
+            return 'dot', 'comma'
+        return 'comma', 'dot'
+    for char, key in (('.', 'dot'), (',', 'comma')):
+        if char not in value:
+            continue
+        if value.count(char) > 1:
+            # Repeated, a thousands separator
+            return None, 'dot' if char == '.' else 'comma'
+        decimals = len(value) - value.rfind(char) - 1
+        if decimals == 3:
+            # 1,234 or 1.234: thousands or three decimals, cannot tell
+            return None, None
+        return key, thousands
+    return None, thousands
+
+
+def _is_number(value):
+    value = value.strip()
+    return bool(value) and bool(NUMBER.match(value)) and bool(DIGITS.search(value))
+
+
+def detect_column_types(rows):
+    # Type of each column of the data rows: ('date', format keys),
+    # ('number', None) or None
+    width = max((len(row) for row in rows), default=0)
+    types = []
+    for idx in range(width):
+        values = [row[idx].strip() for row in rows if idx < len(row) and row[idx].strip()]
+        if not values:
+            types.append(None)
+            continue
+        formats = date_formats_of(values)
+        if formats:
+            types.append(('date', formats))
+        elif sum(map(_is_number, values)) >= TYPE_RATIO * len(values):
+            types.append(('number', None))
+        else:
+            types.append(None)
+    return types
+
+
+def detect_header(first_row, types):
+    # The first row is a header when its cells do not fit the types of their
+    # columns, as the column titles of a date or amount column do not. None
+    # when no column is typed.
+    votes = Counter()
+    for idx, column_type in enumerate(types):
+        if not column_type or idx >= len(first_row):
+            continue
+        cell = first_row[idx].strip()
+        if column_type[0] == 'date':
+            fits = bool(cell) and bool(date_formats_of([cell]))
+        else:
+            fits = _is_number(cell)
+        votes[not fits] += 1
+    if not votes:
+        return None
+    return votes[True] >= votes[False]
+
+
+def detect_number_format(rows, types):
+    # (decimal separator key, thousands separator key) from the values of
+    # the number columns, None for what the values do not tell
+    decimal_votes, thousands_votes = Counter(), Counter()
+    for idx, column_type in enumerate(types):
+        if not column_type or column_type[0] != 'number':
+            continue
+        for row in rows:
+            if idx < len(row) and row[idx].strip():
+                decimal, thousands = number_separators(row[idx])
+                if decimal:
+                    decimal_votes[decimal] += 1
+                if thousands:
+                    thousands_votes[thousands] += 1
+    decimal = decimal_votes.most_common(1)[0][0] if decimal_votes else None
+    thousands = thousands_votes.most_common(1)[0][0] if thousands_votes else None
+    if decimal and (not thousands or thousands == decimal):
+        # The other character groups the thousands
+        thousands = 'comma' if decimal == 'dot' else 'dot'
+    if thousands and not decimal:
+        decimal = 'comma' if thousands == 'dot' else 'dot' if thousands == 'comma' else None
+    return decimal, thousands
+
+
+def sniff_csv(head, truncated=None, encoding=None):
+    # Wizard option values detected from the first bytes of a CSV file.
+    # truncated: whether head is only the start of the file, by default when
+    # it fills SNIFF_SIZE. encoding: the one chosen so far, kept unless the
+    # detected one is certain or it does not decode the sample.
+    if truncated is None:
+        truncated = len(head) >= SNIFF_SIZE
+    options = {}
+    detected, confident = detect_encoding(head)
+    if confident or not _fits(head, encoding, truncated):
+        encoding = options['encoding'] = detected
+    text = _decode_sample(head, encoding, truncated)
+    separator, quote_char, rows = detect_layout(text)
+    if separator:
+        options['separator'] = separator
+        options['quote_char'] = quote_char
+    if not rows:
+        return options
+
+    # Columns are typed on the rows after the first one, which may be a header
+    data_rows = rows[1:] or rows
+    types = detect_column_types(data_rows)
+    has_header = detect_header(rows[0], types) if len(rows) > 1 else None
+    if has_header is not None:
+        options['has_header'] = has_header
+    if not has_header:
+        types = detect_column_types(rows)
+        data_rows = rows
+
+    # Formats matching every date column, the first one of DATE_FORMATS
+    # breaking the ties (day before month, as the default)
+    date_formats = None
+    for column_type in types:
+        if column_type and column_type[0] == 'date':
+            formats = set(column_type[1])
+            date_formats = formats if date_formats is None else (date_formats & formats or date_formats)
+    if date_formats:
+        options['date_format'] = next(key for key in DATE_FORMATS if key in date_formats)
+
+    decimal, thousands = detect_number_format(data_rows, types)
+    if decimal:
+        options['float_decimal_separator'] = decimal
+    if thousands:
+        options['float_thousand_separator'] = thousands
+    return options
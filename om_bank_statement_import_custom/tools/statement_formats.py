@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+# Readers of the structured statement formats banks export: ISO 20022
+# CAMT.053 XML, OFX (SGML 1.x and XML 2.x) and SWIFT MT940. Each yields the
+# booked transactions as rows of COLUMNS with typed values (dates, floats),
+# the layout the import maps by itself, so these files go through the same
+# row pipeline as CSV and XLSX without a mapping step. All readers stream:
+# XML elements are cleared once read and MT940/OFX are read line by line or
+# chunk by chunk, memory does not grow with the file.
+import html
+import io
+import re
+from datetime import date, datetime
+from xml.etree import ElementTree
+
+COLUMNS = ['Date', 'Label', 'Partner', 'Bank Account', 'Amount', 'Currency', 'Foreign Amount', 'Transaction ID']
+# Target field of each column
+MAPPING = [
+    'date', 'payment_ref', 'partner', 'account_number', 'amount',
+    'foreign_currency_code', 'amount_currency', 'unique_import_id',
+]
+EXTENSIONS = {
+    '.xml': 'camt', '.053': 'camt',
+    '.ofx': 'ofx', '.qfx': 'ofx',
+    '.sta': 'mt940', '.mt940': 'mt940', '.940': 'mt940',
+}
+# Bytes read to recognise the format of a file
+SNIFF_SIZE = 4096
+
+
+def sniff_format(head):
+    # Format of a file from its first bytes, False when not a structured statement
+    text = head.decode('latin-1').lstrip('﻿\xef\xbb\xbf \t\r\n')
+    if 'camt.05' in text and '<' in text:
+        return 'camt'
+    if text.startswith('OFXHEADER') or '<OFX>' in text.upper():
+        return 'ofx'
+    if re.match(r'(\{1:[^}]*\}\s*)?(\{2:[^}]*\}\s*)?(\{3:[^}]*\}\s*)?(\{4:\s*)?:20:', text):
+        return 'mt940'
+    return False
+
+
+def _row(day, label, partner, account, amount, currency='', foreign_amount=None, import_id=''):
+    return [day, label or '', partner or '', account or '', amount, currency or '', foreign_amount, import_id or '']
+
+
+# CAMT.053
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _find(elem, path):
+    # Namespace-agnostic elem.find('A/B/C')
+    for name in path.split('/'):
+        if elem is None:
+            return None
+        elem = next((child for child in elem if _local(child.tag) == name), None)
+    return elem
+
+
+def _text(elem, path):
+    found = _find(elem, path)
+    return (found.text or '').strip() if found is not None else ''
+
+
+def _camt_date(elem):
+    value = _text(elem, 'BookgDt/Dt') or _text(elem, 'BookgDt/DtTm') \
+        or _text(elem, 'ValDt/Dt') or _text(elem, 'ValDt/DtTm')
+    return date.fromisoformat(value[:10]) if value else False
+
+
+def _camt_amount(elem, sign):
+    amount = _find(elem, 'Amt')
+    if amount is None:
+        return None, ''
+    return sign * float(amount.text), amount.get('Ccy', '')
+
+
+def _camt_transaction(entry, details, day, sign, currency, batched=False):
+    # Row of one transaction of an entry, details being its TxDtls (or None).
+    # The references of a batched entry are shared by its transactions.
+    amount, _ccy = _camt_amount(entry, sign)
+    if details is not None:
+        own_amount, _ccy = _camt_amount(details, sign)
+        if own_amount is None:
+            own_amount, _ccy = _camt_amount(_find(details, 'AmtDtls/TxAmt'), sign)
+        if own_amount is not None:
+            amount = own_amount
+    # The counterparty is the debtor of a credit and the creditor of a debit
+    party = 'Dbtr' if sign > 0 else 'Cdtr'
+    partner = account = label = import_id = ''
+    foreign_currency, foreign_amount = '', None
+    if details is not None:
+        partner = _text(details, f'RltdPties/{party}/Nm') or _text(details, f'RltdPties/{party}/Pty/Nm')
+        account = _text(details, f'RltdPties/{party}Acct/Id/IBAN') \
+            or _text(details, f'RltdPties/{party}Acct/Id/Othr/Id')
+        remittance = _find(details, 'RmtInf')
+        if remittance is not None:
+            label = ' '.join((line.text or '').strip() for line in remittance if _local(line.tag) == 'Ustrd')
+            if not label:
+                label = _text(remittance, 'Strd/CdtrRefInf/Ref')
+        label = label or _text(details, 'AddtlTxInf')
+        import_id = _text(details, 'Refs/AcctSvcrRef') or _text(details, 'Refs/TxId')
+        instructed = _find(details, 'AmtDtls/InstdAmt')
+        if instructed is not None:
+            foreign_amount, foreign_currency = _camt_amount(instructed, sign)
+            if foreign_currency == currency:
+                foreign_currency, foreign_amount = '', None
+    label = label or _text(entry, 'AddtlNtryInf')
+    if not import_id and not batched:
+        import_id = _text(entry, 'AcctSvcrRef') or _text(entry, 'NtryRef')
+    if not import_id and details is not None:
+        import_id = _text(details, 'Refs/EndToEndId').replace('NOTPROVIDED', '')
+    return _row(day, label, partner, account, amount, foreign_currency, foreign_amount, import_id)
+
+
+def iter_camt_rows(stream, encoding=None):
+    # The encoding is the one of the XML declaration
+    # Yield a row per booked transaction of the Ntry elements of the file.
+    # Entries batching several transactions (one TxDtls each, with their own
+    # amounts) give a row per transaction.
+    stream.seek(0)
+    parents = []
+    for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        if _local(elem.tag) != 'Ntry':
+            continue
+        status = _text(elem, 'Sts/Cd') or _text(elem, 'Sts')
+        if status in ('', 'BOOK'):
+            yield from _camt_entry_rows(elem)
+        # Done with the entry, remove it from its statement
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+
+
+def _camt_entry_rows(entry):
+    # CdtDbtInd is the direction of the entry itself, a reversal (RvslInd)
+    # included: the reversal of a debit is a credit, as RC/RD in MT940
+    sign = 1 if _text(entry, 'CdtDbtInd') == 'CRDT' else -1
+    day = _camt_date(entry)
+    _amount, currency = _camt_amount(entry, sign)
+    transactions = [
+        details for entry_details in entry if _local(entry_details.tag) == 'NtryDtls'
+        for details in entry_details if _local(details.tag) == 'TxDtls'
+    ]
+    if len(transactions) > 1 and all(
+            _find(details, 'Amt') is not None or _find(details, 'AmtDtls/TxAmt') is not None
+            for details in transactions):
+        for details in transactions:
+            yield _camt_transaction(entry, details, day, sign, currency, batched=True)
+    else:
+        yield _camt_transaction(entry, transactions[0] if transactions else None, day, sign, currency)
+
+
+# OFX
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+OFX_CHARSETS = {'1252': 'cp1252', 'ISO-8859-1': 'latin-1', 'NONE': 'latin-1', 'USASCII': 'latin-1'}
+
+
+def _ofx_encoding(head):
+    # OFX 1.x declares its charset in the SGML header, OFX 2.x in the XML declaration
+    text = head.decode('latin-1')
+    match = re.search(r'encoding="([^"]+)"', text)
+    if match:
+        return match.group(1)
+    charset = re.search(r'CHARSET:\s*([\w-]+)', text)
+    encoding = re.search(r'ENCODING:\s*([\w-]+)', text)
+    if encoding and encoding.group(1).upper().replace('-', '') == 'UTF8':
+        return 'utf-8'
+    return OFX_CHARSETS.get(charset.group(1).upper() if charset else 'NONE', 'latin-1')
+
+
+def _ofx_date(value):
+    # YYYYMMDD, optionally followed by the time and time zone
+    return datetime.strptime(value[:8], '%Y%m%d').date()
+
+
+def _ofx_amount(value):
+    return float(value.replace(',', '.')) if value else 0.0
+
+
+def _iter_ofx_tags(text_stream, chunk_size=1024 * 1024):
+    # (closing, tag, value) of every tag. SGML leaves elements unclosed, the
+    # value of a leaf is the text up to the next tag, entities (&amp;) decoded.
+    buffer = ''
+    while True:
+        chunk = text_stream.read(chunk_size)
+        buffer += chunk
+        # Keep the last, maybe incomplete, tag for the next chunk
+        end = max(buffer.rfind('<'), 0) if chunk else len(buffer)
+        for match in OFX_TAG.finditer(buffer, 0, end):
+            yield match.group(1) == '/', match.group(2).upper(), html.unescape(match.group(3).strip())
+        buffer = buffer[end:]
+        if not chunk:
+            return
+
+
+def iter_ofx_rows(stream, encoding=None):
+    # Yield a row per STMTTRN of the bank and credit card statements of the
+    # file. The charset declared in the file wins over encoding.
+    stream.seek(0)
+    encoding = _ofx_encoding(stream.read(SNIFF_SIZE)) or encoding or 'latin-1'
+    stream.seek(0)
+    text = io.TextIOWrapper(stream, encoding=encoding, errors='replace', newline='')
+    try:
+        transaction = None
+        path = []
+        for closing, tag, value in _iter_ofx_tags(text):
+            if tag == 'STMTTRN':
+                if closing:
+                    if transaction is not None:
+                        yield _ofx_row(transaction)
+                    transaction = None
+                else:
+                    if transaction is not None:
+                        # SGML without closing tags
+                        yield _ofx_row(transaction)
+                    transaction = {}
+                path = []
+                continue
+            if transaction is None:
+                continue
+            if closing:
+                if tag in path:
+                    del path[path.index(tag):]
+            elif value:
+                transaction['/'.join(path + [tag])] = value
+            elif tag in ('PAYEE', 'BANKACCTTO', 'CCACCTTO', 'CURRENCY', 'ORIGCURRENCY'):
+                path.append(tag)
+        if transaction:
+            yield _ofx_row(transaction)
+    finally:
+        text.detach()
+
+
+def _ofx_row(transaction):
+    amount = _ofx_amount(transaction.get('TRNAMT'))
+    partner = transaction.get('NAME') or transaction.get('PAYEE/NAME', '')
+    memo = transaction.get('MEMO', '')
+    label = ' '.join(value for value in (partner, memo) if value)
+    account = transaction.get('BANKACCTTO/ACCTID') or transaction.get('CCACCTTO/ACCTID', '')
+    foreign_currency, foreign_amount = '', None
+    # ORIGCURRENCY: TRNAMT is in the statement currency, converted from
+    # CURSYM. CURRENCY: TRNAMT is in CURSYM. CURRATE is the ratio of the
+    # statement currency to CURSYM.
+    for aggregate in ('ORIGCURRENCY', 'CURRENCY'):
+        rate = _ofx_amount(transaction.get(f'{aggregate}/CURRATE'))
+        symbol = transaction.get(f'{aggregate}/CURSYM')
+        if rate and symbol:
+            if aggregate == 'ORIGCURRENCY':
+                foreign_currency, foreign_amount = symbol, round(amount / rate, 2)
+            else:
+                foreign_currency, foreign_amount, amount = symbol, amount, round(amount * rate, 2)
+            break
+    day = _ofx_date(transaction.get('DTPOSTED') or transaction.get('DTUSER', ''))
+    return _row(day, label, partner, account, amount, foreign_currency, foreign_amount, transaction.get('FITID'))
+
+
+# MT940
+
+MT940_TAG = re.compile(r'^:(\d\d[A-Z]?):(.*)$')
+MT940_LINE = re.compile(
+    r'^(?P<value_date>\d{6})(?P<entry_date>\d{4})?(?P<mark>R?[CD])(?P<funds>[A-Z])?'
+    r'(?P<amount>\d+,\d*)(?P<type>[A-Z0-9]{4})(?P<reference>[^/\n]{0,16})(?://(?P<bank_reference>.{0,16}))?'
+)
+# Keys of the structured :86: field ("/NAME/ACME/IBAN/NL..")
+MT940_KEYS = ('NAME', 'IBAN', 'REMI', 'EREF', 'ORDP', 'BENM', 'CNTP', 'ADDR', 'BIC', 'TRCD', 'PREF', 'MARF', 'CSID')
+
+
+def _mt940_date(value):
+    return datetime.strptime(value, '%y%m%d').date()
+
+
+def _mt940_transaction(line, info):
+    match = MT940_LINE.match(line)
+    if not match:
+        raise ValueError(f"Invalid :61: statement line '{line}'")
+    value_date = _mt940_date(match['value_date'])
+    day = value_date
+    if match['entry_date']:
+        # The booking date has no year, take the one closest to the value date
+        entry = date(value_date.year, int(match['entry_date'][:2]), int(match['entry_date'][2:]))
+        if (entry - value_date).days > 180:
+            entry = entry.replace(year=value_date.year - 1)
+        elif (value_date - entry).days > 180:
+            entry = entry.replace(year=value_date.year + 1)
+        day = entry
+    amount = float(match['amount'].replace(',', '.'))
+    if match['mark'] in ('D', 'RC'):
+        amount = -amount
+    reference = match['reference'].strip()
+    import_id = (match['bank_reference'] or '').strip() or (reference if reference != 'NONREF' else '')
+    partner, account, label = _mt940_info(info)
+    return _row(day, label or reference, partner, account, amount, import_id=import_id)
+
+
+def _mt940_info(lines):
+    # (partner, account, label) of the :86: field: SWIFT structured
+    # (/NAME/.../IBAN/...), German ?NN subfields or free text
+    info = ''.join(lines)
+    if info.startswith('/'):
+        parts = re.split(r'/(%s)/' % '|'.join(MT940_KEYS), info)
+        values = dict(zip(parts[1::2], (value.strip(' /') for value in parts[2::2])))
+        partner = values.get('NAME', '')
+        return partner, values.get('IBAN', ''), values.get('REMI') or partner
+    if re.match(r'^\d{3}\?', info):
+        subfields = dict(re.findall(r'\?(\d\d)([^?]*)', info))
+        label = ''.join(subfields.get(str(key), '') for key in range(20, 30))
+        label += ''.join(subfields.get(str(key), '') for key in range(60, 64))
+        partner = (subfields.get('32', '') + subfields.get('33', '')).strip()
+        return partner, subfields.get('31', '').strip(), label.strip() or partner
+    return '', '', ' '.join(line.strip() for line in lines)
+
+
+def _iter_mt940_fields(text):
+    # (tag, lines) of the fields of the statements. A field may span several
+    # lines, a line not starting a tag continues the previous one.
+    tag, lines = None, []
+    for raw_line in text:
+        line = raw_line.rstrip('\r\n')
+        match = MT940_TAG.match(line)
+        if match:
+            if tag:
+                yield tag, lines
+            tag, lines = match.group(1), [match.group(2)]
+        elif tag and line and line != '-' and not line.startswith(('-}', '{')):
+            lines.append(line)
+        else:
+            # End of a message block
+            if tag:
+                yield tag, lines
+            tag, lines = None, []
+    if tag:
+        yield tag, lines
+
+
+def iter_mt940_rows(stream, encoding='utf-8'):
+    # Yield a row per :61: statement line, with its :86: information
+    stream.seek(0)
+    text = io.TextIOWrapper(stream, encoding=encoding, errors='replace', newline=None)
+    try:
+        line61 = None
+        info = []
+        for tag, lines in _iter_mt940_fields(text):
+            if tag == '86' and line61 is not None:
+                info = lines
+                continue
+            if line61 is not None:
+                yield _mt940_transaction(line61, info)
+            # Only the first line of :61: is parsed, the next one holds
+            # supplementary details
+            line61, info = (lines[0], []) if tag == '61' else (None, [])
+        if line61 is not None:
+            yield _mt940_transaction(line61, info)
+    finally:
+        text.detach()
+
+
+READERS = {
+    'camt': iter_camt_rows,
+    'ofx': iter_ofx_rows,
+    'mt940': iter_mt940_rows,
+}
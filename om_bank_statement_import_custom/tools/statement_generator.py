@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Synthetic bank statements for benchmarks and manual tests of the import
+# pipeline. Rows are generated lazily from a seed, so the same arguments
+# always give the same file and a million rows never sit in memory at once.
+import csv
+import io
+import random
+from datetime import date, timedelta
+
+import openpyxl
+
+HEADER = ['Date', 'Label', 'Partner', 'Amount', 'Currency', 'Foreign Amount', 'Transaction ID']
+LABELS = ['Card payment', 'Transfer', 'Direct debit', 'Invoice', 'Salary', 'Refund', 'Fee']
+PARTNER_WORDS = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Stark', 'Wayne', 'Hooli', 'Vandelay', 'Wonka', 'Tyrell']
+LEGAL_FORMS = ['Ltd', 'GmbH', 'Inc', 'SA', 'BV', '']
+
+
+def format_amount(amount, decimal_sep='.', thousand_sep=''):
+    text = f"{amount:,.2f}" if thousand_sep else f"{amount:.2f}"
+    return text.translate({ord(','): thousand_sep, ord('.'): decimal_sep})
+
+
+def _letters(number):
+    # 0 -> 'A', 25 -> 'Z', 26 -> 'BA': distinct words without digits, which
+    # partner matching would drop as references
+    letters = ''
+    while True:
+        number, rest = divmod(number, 26)
+        letters = chr(ord('A') + rest) + letters
+        if not number:
+            return letters.capitalize()
+
+
+def iter_rows(rows=1000, partners=100, currencies=(), foreign_ratio=0.2, date_format='%d/%m/%Y',
+              decimal_sep='.', thousand_sep='', start=date(2026, 1, 1), days=31, typed=False, seed=0):
+    # Yield the header, then `rows` transactions spread over `days` days and
+    # `partners` distinct partner names. A foreign_ratio share of the rows
+    # carries one of `currencies`. With typed, dates and amounts are Python
+    # values (as read from XLSX) instead of formatted text.
+    rng = random.Random(seed)
+    partner_names = [
+        ' '.join(filter(None, [PARTNER_WORDS[i % len(PARTNER_WORDS)], _letters(i), LEGAL_FORMS[i % len(LEGAL_FORMS)]]))
+        for i in range(max(partners, 1))
+    ]
+    yield list(HEADER)
+    for i in range(rows):
+        day = start + timedelta(days=i * days // max(rows, 1))
+        amount = round(rng.uniform(-5000, 5000), 2) or 0.01
+        currency = foreign_amount = ''
+        if currencies and rng.random() < foreign_ratio:
+            currency = rng.choice(currencies)
+            foreign_amount = round(amount * rng.uniform(0.5, 1.5), 2)
+        if typed:
+            row = [day, None, None, amount, currency, foreign_amount or None, None]
+        else:
+            row = [
+                day.strftime(date_format), None, None, format_amount(amount, decimal_sep, thousand_sep),
+                currency, format_amount(foreign_amount, decimal_sep, thousand_sep) if currency else '', None,
+            ]
+        row[1] = f"{rng.choice(LABELS)} {i + 1}"
+        row[2] = partner_names[rng.randrange(len(partner_names))]
+        row[6] = f"TX{seed:04d}{i + 1:09d}"
+        yield row
+
+
+def write_csv(stream, rows, delimiter=',', encoding='utf-8'):
+    # stream is a binary file object
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    try:
+        csv.writer(text, delimiter=delimiter).writerows(rows)
+    finally:
+        text.flush()
+        text.detach()
+
+
+def write_xlsx(stream, rows):
+    # Write-only workbooks stream rows to the sheet XML
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = wb.create_sheet('Statement')
+    for row in rows:
+        sheet.append(row)
+    wb.save(stream)
+
+
+def generate(file_format='csv', delimiter=',', encoding='utf-8', **options):
+    # Return the content of a synthetic statement file, see iter_rows() for the options
+    stream = io.BytesIO()
+    if file_format == 'xlsx':
+        write_xlsx(stream, iter_rows(typed=True, **options))
+    else:
+        write_csv(stream, iter_rows(**options), delimiter=delimiter, encoding=encoding)
+    return stream.getvalue()
@@ -2,14 +2,77 @@
 import base64
 import openpyxl
 import io
+import psycopg2
 import csv
-from datetime import datetime
+import hashlib
+import itertools
 import logging
+import mmap
+import os
+import random
+import time
+import zipfile
+from contextlib import closing, contextmanager
+from collections import defaultdict
+from xml.etree import ElementTree
 from odoo import models, fields, _, api
-from odoo.exceptions import ValidationError, UserError
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import config, mute_logger
+from odoo.tools.lru import LRU
+from odoo.addons.base.models.res_bank import sanitize_account_number
+
+from ..tools import columnar, csv_parallel, parsing, sniffing, statement_formats
+from ..tools.dedupe import DuplicateChecker
+from ..tools.errors import ErrorCollector
+from ..tools.converter import LookupKeys, RowConverter, partner_key
+from ..tools.partner_matcher import PartnerMatcher
+from ..tools.profiling import ImportProfiler
 
 _logger = logging.getLogger(__name__)
 
+# Parsed previews and sheet lists, keyed by staged content checksum and parse options
+_preview_cache = LRU(64)
+
+# CSV files from this size on are parsed by a pool of worker processes
+PARALLEL_PARSE_MIN_SIZE = 16 * 1024 * 1024
+
+# Statement files taken from an archive or the More Files of a batch. The
+# format of the other files than CSV/XLSX is recognised from their content.
+STATEMENT_EXTENSIONS = ('.csv', '.xlsx', '.txt') + tuple(statement_formats.EXTENSIONS)
+FILE_KINDS = {'csv': 'CSV', 'xlsx': 'XLSX', 'camt': 'CAMT.053', 'ofx': 'OFX', 'mt940': 'MT940'}
+
+
+class JournalBusyError(UserError):
+    # Another transaction imports into the journal, the import can be tried
+    # again as it is once that one is finished
+    pass
+
+
+class _MmapRawIO(io.RawIOBase):
+    # Minimal raw stream over a mmap so it can be wrapped in io.BufferedReader
+    # and handed to csv/openpyxl without copying the file into memory.
+    def __init__(self, mm):
+        self._mm = mm
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._mm.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._mm.seek(offset, whence)
+        return self._mm.tell()
+
+    def tell(self):
+        return self._mm.tell()
+
+
 class BankStatementImport(models.TransientModel):
     _name = 'om.bank.statement.import'
     _description = 'Import Bank Statement'
@@ -17,7 +80,13 @@ class BankStatementImport(models.TransientModel):
     journal_id = fields.Many2one('account.journal', string='Journal', required=True, domain=[('type', '=', 'bank')])
     file_data = fields.Binary(string='File', required=True)
     file_name = fields.Char(string='File Name')
+    # Decoded copy of file_data in the filestore, shared by content hash
+    staged_attachment_id = fields.Many2one('ir.attachment', string='Staged File', ondelete='set null')
     mapping_line_ids = fields.One2many('om.bank.statement.import.mapping', 'wizard_id', string='Column Mapping')
+    # More statements imported with the same mapping, next to the file or the files of a ZIP archive
+    batch_file_ids = fields.Many2many('ir.attachment', string='More Files',
+                                      help="Further statement files imported with the same mapping and options. "
+                                           "Files named after the bank account of another journal go to that journal.")
     
     # File options
     sheet_name = fields.Char(string='Sheet Name')
@@ -27,7 +96,10 @@ class BankStatementImport(models.TransientModel):
     # Formatting options
     encoding = fields.Selection([
         ('utf-8', 'UTF-8'),
+        ('utf-8-sig', 'UTF-8 with BOM'),
         ('utf-16', 'UTF-16'),
+        ('utf-16-le', 'UTF-16 LE'),
+        ('utf-16-be', 'UTF-16 BE'),
         ('windows-1252', 'Windows-1252'),
         ('latin1', 'Latin1'),
     ], string='Encoding', default='utf-8')
@@ -67,113 +139,240 @@ class BankStatementImport(models.TransientModel):
         ('fail', 'Stop Import'),
         ('skip', 'Skip Row'),
     ], string='On Error', default='fail')
+    duplicate_handling = fields.Selection([
+        ('skip', 'Skip'),
+        ('flag', 'Import and Flag'),
+        ('fail', 'Stop Import'),
+        ('none', 'Do Not Check'),
+    ], string='Duplicates', default='skip',
+        help="Transactions already in the journal, found by Transaction ID when a column is mapped to it, "
+             "otherwise by date, amount, label and partner. Flagged lines are marked as Possible Duplicate; "
+             "a known Transaction ID is always skipped.")
     
     create_partner = fields.Boolean(string='Create New Partners', default=True, help="If checked, new partners will be created if not found by name.")
+    partner_matching = fields.Selection([
+        ('exact', 'Exact Name'),
+        ('fuzzy', 'Similar Name'),
+    ], string='Partner Matching', default='exact',
+        help="Partners are first matched by bank account when a column is mapped to it. "
+             "Similar Name also matches names differing in case, accents, legal form or appended references.")
+    partner_match_threshold = fields.Float(string='Name Similarity', default=0.8, help="Minimum similarity (0 to 1) for a name to match an existing partner.")
+    test_sample = fields.Selection([
+        ('all', 'All Rows'),
+        ('first', 'First Rows'),
+        ('random', 'Random Rows'),
+    ], string='Rows to Test', default='all', help="Rows checked by Test Import. Partners are never created by a test.")
+    test_sample_size = fields.Integer(string='Sample Size', default=1000)
+    test_max_errors = fields.Integer(string='Stop Test After Errors', default=0, help="Stop Test Import after this many errors. 0 means no limit.")
+    batch_size = fields.Integer(string='Lines per Batch', default=1000, help="Statement lines are created in batches of this size, each in its own savepoint. Set to 0 to create all lines in a single operation.")
+    reject_attachment_id = fields.Many2one('ir.attachment', string='Rejected Rows', readonly=True)
+    profile_id = fields.Many2one('om.bank.statement.import.profile', string='Import Profile',
+                                 help="Saved column mapping and options, also used by the imports without this wizard.")
+    split_by = fields.Selection([
+        ('none', 'Single Statement'),
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+        ('lines', 'Number of Lines'),
+    ], string='Split Statements', default='none',
+        help="Create one statement per day, week or month of the transactions, or per block of lines, "
+             "each one opening with the closing balance of the previous one.")
+    split_max_lines = fields.Integer(string='Lines per Statement', default=5000)
+    auto_reconcile = fields.Selection([
+        ('none', 'No Matching'),
+        ('propose', 'Propose Matches'),
+        ('apply', 'Reconcile'),
+    ], string='Match Open Items', default='none',
+        help="Match the imported lines with the open invoices and bills for their full amount, "
+             "by reference found in the label, by partner and amount, or by amount alone. "
+             "Reconcile reconciles the matches by reference or partner right away; "
+             "the others are proposed on the lines, to reconcile from the statement lines list.")
+    insert_mode = fields.Selection([
+        ('orm', 'Standard'),
+        ('bulk', 'Bulk Insert'),
+    ], string='Line Creation', default='orm',
+        help="Bulk Insert writes the lines, journal entries and journal items of a batch with direct SQL inserts "
+             "and computes them once, for very large statements. The accounting result is the same, "
+             "but no creation message is logged on the journal entries.")
+
+    @api.constrains('split_by', 'split_max_lines')
+    def _check_split_max_lines(self):
+        for wizard in self:
+            if wizard.split_by == 'lines' and wizard.split_max_lines <= 0:
+                raise ValidationError(_("Lines per Statement must be greater than 0."))
+
+    @api.constrains('partner_match_threshold')
+    def _check_partner_match_threshold(self):
+        for wizard in self:
+            if not 0 < wizard.partner_match_threshold <= 1:
+                raise ValidationError(_("Name Similarity must be greater than 0 and at most 1."))
+
+    @api.onchange('file_data')
+    def _onchange_file_data(self):
+        # The upload is decoded once here, option changes reuse the staged file
+        self.staged_attachment_id = self._stage_file() if self.file_data else False
+        # The options of a CSV file are detected before its preview is parsed,
+        # unless they come from a profile
+        if self.file_data and not self.profile_id and (self.file_name or '').lower().endswith('.csv'):
+            try:
+                self.update(self._sniff_csv_options())
+            except Exception as e:
+                _logger.warning(f"Could not detect the options of {self.file_name}: {e}")
+        self._onchange_parse_file()
 
-    @api.onchange('file_data', 'sheet_options', 'has_header', 'encoding', 'separator', 'quote_char')
+    def _sniff_csv_options(self):
+        # Options read from the first bytes of the file, see tools/sniffing.py
+        with self._open_staged_file() as stream:
+            return sniffing.sniff_csv(stream.read(sniffing.SNIFF_SIZE), encoding=self.encoding)
+
+    @api.onchange('sheet_options', 'has_header', 'encoding', 'separator', 'quote_char')
     def _onchange_parse_file(self):
         self.mapping_line_ids = [(5, 0, 0)]  # Clear existing lines
         if not self.file_data:
             return
         
+        try:
+            self.mapping_line_ids = [(0, 0, dict(vals)) for vals in self._apply_profile_mapping(self._get_preview_lines())]
+        except Exception as e:
+             _logger.error(f"Error parsing file for preview: {e}")
+             pass
+
+    @api.onchange('profile_id')
+    def _onchange_profile_id(self):
+        if not self.profile_id:
+            return
+        options = self.profile_id.import_options or {}
+        for name, value in options.items():
+            if name in self._fields:
+                self[name] = value
+        self._onchange_parse_file()
+
+    def _apply_profile_mapping(self, lines):
+        # Structured statements keep their own mapping
+        if not self.profile_id or self._get_file_format() in statement_formats.READERS:
+            return lines
+        return self.profile_id._map_columns(lines)
+
+    def action_save_profile(self):
+        # Save the mapping and options as a new profile, or update the one in use
+        self.ensure_one()
+        Profile = self.env['om.bank.statement.import.profile']
+        vals = Profile._prepare_from_wizard(self)
+        if self.profile_id:
+            self.profile_id.write(vals)
+        else:
+            self.profile_id = Profile.create(dict(vals, name=self.file_name or self.journal_id.name))
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def _get_preview_lines(self):
+        # Toggling an option in the wizard fires the onchange again, serve
+        # previews already built for this content and these options from cache
+        file_name = (self.file_name or '').lower()
+        attachment = self.staged_attachment_id or self._stage_file()
+        cache_key = (
+            attachment.checksum, file_name.rsplit('.', 1)[-1], self.sheet_options,
+            self.has_header, self.encoding, self.separator, self.quote_char,
+        )
+        lines = _preview_cache.get(cache_key)
+        if lines is None:
+            lines = _preview_cache[cache_key] = self._parse_preview_lines()
+        return lines
+
+    def _parse_preview_lines(self):
         file_name = (self.file_name or '').lower()
         
-        try:
-            file_data = base64.b64decode(self.file_data)
-            header = []
-            sample = []
-            
-            if file_name.endswith('.csv'):
-                try:
-                    data_file = io.StringIO(file_data.decode(self.encoding or 'utf-8'))
-                    
-                    csv_separator = ','
-                    if self.separator == 'semicolon':
-                        csv_separator = ';'
-                    elif self.separator == 'tab':
-                        csv_separator = '\t'
-                    elif self.separator == 'space':
-                        csv_separator = ' '
-                        
-                    csv_quote = self.quote_char or '"'
-                    reader = csv.reader(data_file, delimiter=csv_separator, quotechar=csv_quote)
-                    
-                    rows = []
-                    try:
-                        for i in range(2):
-                            rows.append(next(reader))
-                    except StopIteration:
-                        pass
-                        
-                    if rows:
-                        if self.has_header:
-                            header = rows[0]
-                            sample = rows[1] if len(rows) > 1 else []
-                        else:
-                            header = [f"Column {i+1}" for i in range(len(rows[0]))]
-                            sample = rows[0]
-                except Exception as e:
-                    _logger.warning(f"CSV Parse Error: {e}")
+        header = []
+        sample = []
+        
+        if file_name.endswith('.zip'):
+            # Columns of an archive are mapped on its first statement file
+            wizards = self._get_batch_wizards(limit=1)
+            return wizards[0]._parse_preview_lines() if wizards else []
 
-            elif file_name.endswith('.xlsx'):
-                wb = openpyxl.load_workbook(io.BytesIO(file_data), data_only=True)
-                
-                # Sheet selection logic
-                sheet_names = wb.sheetnames
-                if not self.sheet_options or self.sheet_options not in sheet_names:
-                    # Default to first sheet if not selected or invalid
-                    sheet = wb.worksheets[0]
-                else:
-                    sheet = wb[self.sheet_options]
-                
-                rows = list(sheet.iter_rows(values_only=True, max_row=2))
-                
-                if rows:
-                    row1 = list(rows[0]) if rows else []
-                    row2 = list(rows[1]) if len(rows) > 1 else []
+        if self._get_file_format() in statement_formats.READERS:
+            # Structured statements have a fixed layout, mapped by itself
+            with self._open_staged_file() as stream, closing(self._iter_statement_rows(stream)) as rows:
+                sample = next(rows, [])
+            return [{
+                'column_index': idx,
+                'column_name': col_name,
+                'example_content': str(sample[idx]) if idx < len(sample) and sample[idx] not in (None, '') else '',
+                'target_field': target,
+            } for idx, (col_name, target) in enumerate(zip(statement_formats.COLUMNS, statement_formats.MAPPING))]
+
+        if file_name.endswith('.csv'):
+            try:
+                # Only the bytes of the first two records are decoded
+                with self._open_staged_file() as stream, closing(self._iter_csv_rows(stream)) as csv_rows:
+                    rows = list(itertools.islice(csv_rows, 2))
                     
+                if rows:
                     if self.has_header:
-                        header = row1
-                        sample = row2
+                        header = rows[0]
+                        sample = rows[1] if len(rows) > 1 else []
                     else:
-                        header = [f"Column {i+1}" for i in range(len(row1))]
-                        sample = row1
-                         
-            lines = []
-            for idx, col_name in enumerate(header):
-                if not col_name and self.has_header:
-                    continue
-                
-                col_label = str(col_name) if col_name is not None else f"Column {idx+1}"
-                
-                # Auto-guess field
-                target = False
-                col_lower = col_label.lower()
-                if 'date' in col_lower:
-                    target = 'date'
-                elif 'amount' in col_lower or 'debit' in col_lower or 'credit' in col_lower:
-                    target = 'amount'
-                elif 'partner' in col_lower or 'customer' in col_lower or 'vendor' in col_lower:
-                    target = 'partner'
-                elif 'label' in col_lower or 'desc' in col_lower or 'ref' in col_lower:
-                    target = 'payment_ref'
-                elif 'curr' in col_lower:
-                    target = 'foreign_currency_code'
-                    
-                example = str(sample[idx]) if idx < len(sample) and sample[idx] is not None else ''
+                        header = [f"Column {i+1}" for i in range(len(rows[0]))]
+                        sample = rows[0]
+            except Exception as e:
+                _logger.warning(f"CSV Parse Error: {e}")
+
+        elif file_name.endswith('.xlsx'):
+            # Only the first two rows are needed, stop reading the sheet there
+            with self._open_staged_file() as stream, closing(self._iter_xlsx_rows(stream)) as xlsx_rows:
+                rows = list(itertools.islice(xlsx_rows, 2))
+            
+            if rows:
+                row1 = list(rows[0]) if rows else []
+                row2 = list(rows[1]) if len(rows) > 1 else []
                 
-                lines.append((0, 0, {
-                    'column_index': idx,
-                    'column_name': col_label,
-                    'example_content': example,
-                    'target_field': target
-                }))
+                if self.has_header:
+                    header = row1
+                    sample = row2
+                else:
+                    header = [f"Column {i+1}" for i in range(len(row1))]
+                    sample = row1
+                     
+        lines = []
+        for idx, col_name in enumerate(header):
+            if not col_name and self.has_header:
+                continue
             
-            self.mapping_line_ids = lines
+            col_label = str(col_name) if col_name is not None else f"Column {idx+1}"
             
-        except Exception as e:
-             _logger.error(f"Error parsing file for preview: {e}")
-             pass
+            # Auto-guess field
+            target = False
+            col_lower = col_label.lower()
+            if 'date' in col_lower:
+                target = 'date'
+            elif 'amount' in col_lower or 'debit' in col_lower or 'credit' in col_lower:
+                target = 'amount'
+            elif 'iban' in col_lower or 'account' in col_lower:
+                target = 'account_number'
+            elif 'partner' in col_lower or 'customer' in col_lower or 'vendor' in col_lower:
+                target = 'partner'
+            elif 'transaction id' in col_lower or col_lower in ('id', 'transaction', 'unique id'):
+                target = 'unique_import_id'
+            elif 'label' in col_lower or 'desc' in col_lower or 'ref' in col_lower:
+                target = 'payment_ref'
+            elif 'curr' in col_lower:
+                target = 'foreign_currency_code'
+                
+            example = str(sample[idx]) if idx < len(sample) and sample[idx] is not None else ''
+            
+            lines.append({
+                'column_index': idx,
+                'column_name': col_label,
+                'example_content': example,
+                'target_field': target
+            })
+        
+        return lines
 
     def _get_sheet_options(self):
         if not self.file_data:
@@ -183,16 +382,165 @@ class BankStatementImport(models.TransientModel):
              return []
              
         try:
-             raw_data = base64.b64decode(self.file_data)
-             wb = openpyxl.load_workbook(io.BytesIO(raw_data), read_only=True)
-             return [(name, name) for name in wb.sheetnames]
+             attachment = self.staged_attachment_id or self._stage_file()
+             cache_key = ('sheet_names', attachment.checksum)
+             sheet_names = _preview_cache.get(cache_key)
+             if sheet_names is None:
+                 with self._open_staged_file() as stream:
+                     sheet_names = _preview_cache[cache_key] = self._read_xlsx_sheet_names(stream)
+             return [(name, name) for name in sheet_names]
         except:
              return []
+
+    def _read_xlsx_sheet_names(self, stream):
+        # The sheet list lives in xl/workbook.xml, no worksheet has to be loaded
+        try:
+            with zipfile.ZipFile(stream) as archive, archive.open('xl/workbook.xml') as workbook:
+                return [
+                    elem.get('name')
+                    for _event, elem in ElementTree.iterparse(workbook)
+                    if elem.tag.rsplit('}', 1)[-1] == 'sheet'
+                ]
+        except KeyError:
+            # Workbook part stored under a non-standard name
+            stream.seek(0)
+            wb = openpyxl.load_workbook(stream, read_only=True)
+            sheet_names = wb.sheetnames
+            wb.close()
+            return sheet_names
+
+    def _stage_file(self):
+        self.ensure_one()
+        return self._stage_content(base64.b64decode(self.file_data), self.file_name or 'Imported Statement')
+
+    @api.model
+    def _stage_content(self, raw_data, name):
+        checksum = hashlib.sha1(raw_data).hexdigest()
+        # ir.attachment stores its content by sha1 in the filestore, reuse the
+        # staging of an identical upload instead of writing it again
+        Attachment = self.env['ir.attachment']
+        attachment = Attachment.search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', False),
+            ('checksum', '=', checksum),
+            ('create_uid', '=', self.env.uid),
+        ], limit=1)
+        if not attachment:
+            attachment = Attachment.create({
+                'name': name,
+                'raw': raw_data,
+                'res_model': self._name,
+            })
+        return attachment
+
+    @contextmanager
+    def _open_staged_file(self):
+        # Yield a binary stream over the staged upload. Filestore content is
+        # memory-mapped so every preview and import reads the same pages.
+        attachment = self.staged_attachment_id or self._stage_file()
+        if not attachment.store_fname or not attachment.file_size:
+            yield io.BytesIO(attachment.raw or b'')
+            return
+        with open(attachment._full_path(attachment.store_fname), 'rb') as staged_file, \
+                mmap.mmap(staged_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield io.BufferedReader(_MmapRawIO(mm))
+
+    def unlink(self):
+        attachments = self.staged_attachment_id
+        res = super().unlink()
+        # Drop staged files no longer used by any wizard
+        still_used = self.sudo().search([('staged_attachment_id', 'in', attachments.ids)]).staged_attachment_id
+        (attachments - still_used).sudo().unlink()
+        return res
+
+    @api.autovacuum
+    def _gc_staged_files(self):
+        # Staged files of wizards that were never saved are not removed by unlink()
+        limit_date = fields.Datetime.subtract(fields.Datetime.now(), hours=self._transient_max_hours or 1)
+        attachments = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', False),
+            ('create_date', '<', limit_date),
+        ])
+        still_used = self.sudo().search([('staged_attachment_id', 'in', attachments.ids)]).staged_attachment_id
+        (attachments - still_used).unlink()
     
     def test_import(self):
         return self.import_file(dry_run=True)
 
-    def import_file(self, dry_run=False):
+    def import_file_async(self):
+        mapping = self._get_mapping()
+        if self._is_batch():
+            wizards = self._get_batch_wizards()
+        elif self._get_import_method():
+            wizards = [self]
+        else:
+            raise ValidationError(_("Invalid file format. Please upload a .csv, .xlsx, CAMT.053, OFX, MT940 or .zip file."))
+
+        # One job per file. Users only read jobs, which are created here as
+        # superuser for the current user, from files the user can read.
+        Job = self.env['om.bank.statement.import.job']
+        jobs = Job
+        for wizard in wizards:
+            attachment = wizard.staged_attachment_id or wizard._stage_file()
+            attachment.check('read')
+            job = Job.sudo().create({
+                'name': wizard.file_name or 'Imported Statement',
+                'user_id': self.env.uid,
+                'journal_id': wizard.journal_id.id,
+                'mapping': mapping,
+                'import_options': wizard._get_import_options(),
+            })
+            job.attachment_id = attachment.sudo().copy({'res_model': job._name, 'res_id': job.id})
+            jobs |= job
+        Job._trigger_cron()
+        if len(jobs) == 1:
+            return {
+                'type': 'ir.actions.act_window',
+                'name': _('Bank Statement Import'),
+                'view_mode': 'form',
+                'res_model': jobs._name,
+                'res_id': jobs.id,
+                'target': 'current',
+            }
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Bank Statement Imports'),
+            'view_mode': 'tree,form',
+            'res_model': jobs._name,
+            'domain': [('id', 'in', jobs.ids)],
+            'target': 'current',
+        }
+
+    def _get_import_options(self):
+        # Everything needed to rebuild this wizard in memory for a background
+        # job or a file of a batch
+        options = {name: self[name] for name in (
+            'file_name', 'sheet_options', 'has_header', 'encoding', 'separator', 'quote_char',
+            'date_format', 'float_decimal_separator', 'float_thousand_separator',
+            'on_error', 'duplicate_handling', 'create_partner', 'partner_matching', 'partner_match_threshold', 'batch_size',
+            'insert_mode', 'split_by', 'split_max_lines', 'auto_reconcile',
+        )}
+        options['mapping_lines'] = [{
+            'column_index': line.column_index,
+            'column_name': line.column_name,
+            'target_field': line.target_field,
+        } for line in self.mapping_line_ids]
+        return options
+
+    @api.model
+    def _new_from_options(self, options, journal, attachment):
+        # Import wizard in memory only, no transient record is written
+        options = dict(options)
+        mapping_lines = options.pop('mapping_lines', [])
+        return self.new(dict(
+            options,
+            journal_id=journal.id,
+            staged_attachment_id=attachment.id,
+            mapping_line_ids=[(0, 0, line) for line in mapping_lines],
+        ))
+
+    def _get_mapping(self):
         if not self.journal_id.suspense_account_id:
             raise ValidationError(_("The journal '%s' does not have a Suspense Account defined. Please go to Accounting/Invoicing Configuration -> Journals and set a Suspense Account for this journal.") % self.journal_id.name)
 
@@ -212,55 +560,23 @@ class BankStatementImport(models.TransientModel):
              raise ValidationError(_("Please map a 'Date' column."))
         if 'amount' not in mapping:
              raise ValidationError(_("Please map an 'Amount' column."))
+        return mapping
 
-        statement = False
-        file_name = (self.file_name or '').lower()
-        raw_data = base64.b64decode(self.file_data)
-        
-        logs = []
-        
-        if file_name.endswith('.csv'):
-            res = self._import_csv(raw_data, mapping, dry_run=dry_run)
-            if dry_run:
-                logs = res
-            else:
-                statement = res
-        elif file_name.endswith('.xlsx'):
-            res = self._import_xlsx(raw_data, mapping, dry_run=dry_run)
-            if dry_run:
-                logs = res
-            else:
-                statement = res
-        else:
-            raise ValidationError(_("Invalid file format. Please upload .csv or .xlsx file."))
-        
+    def import_file(self, dry_run=False):
+        mapping = self._get_mapping()
+        profiler = ImportProfiler(self.env.cr)
+        self.reject_attachment_id = False
+        if self._is_batch():
+            return self._import_batch(mapping, dry_run=dry_run, profiler=profiler)
+
+        res, _history = self._run_import(mapping, profiler, dry_run=dry_run)
+        rejects = self.reject_attachment_id
         if dry_run:
-             message = "\n".join(logs)
-             is_success = True
-             if not logs:
-                 title = _("Test Failed")
-                 message = "No logs generated."
-                 is_success = False
-             elif "Error" not in message and "Fail" not in message:
-                 title = _("Test Successful!")
-                 is_success = True
-             else:
-                 title = _("Test Completed with Issues")
-                 is_success = False
-                 
-             return {
-                 'type': 'ir.actions.client',
-                 'tag': 'display_notification',
-                 'params': {
-                     'title': title,
-                     'message': message,
-                     'type': 'success' if is_success else 'warning',
-                     'sticky': True,
-                 }
-             }
+            return self._get_test_notification(res + [profiler.format_report()], rejects)
+        statement = res
 
         if statement:
-            return {
+            action = {
                 'type': 'ir.actions.act_window',
                 'name': _('Bank Statement'),
                 'view_mode': 'form',
@@ -268,294 +584,1109 @@ class BankStatementImport(models.TransientModel):
                 'res_id': statement.id,
                 'target': 'current',
             }
+            if len(statement) > 1:
+                # A split import
+                action.update({
+                    'name': _('Bank Statements'),
+                    'view_mode': 'tree,form',
+                    'res_id': False,
+                    'domain': [('id', 'in', statement.ids)],
+                })
+            if rejects:
+                skipped = profiler.counters.get('rows_skipped', 0)
+                return self._get_notification(
+                    _("Bank Statement Imported, %d Rows Rejected") % skipped, "", 'warning', rejects, next_action=action)
+            return action
 
-    def _parse_float(self, value):
-        if not value:
-            return 0.0
-        if isinstance(value, float) or isinstance(value, int):
-            return float(value)
-        
-        value = str(value).strip()
-        
-        thousand_sep = ','
-        if self.float_thousand_separator == 'dot':
-            thousand_sep = '.'
-        elif self.float_thousand_separator == 'space':
-            thousand_sep = ' '
-            
-        decimal_sep = '.'
-        if self.float_decimal_separator == 'comma':
-            decimal_sep = ','
-            
-        if thousand_sep:
-            value = value.replace(thousand_sep, '')
-        if decimal_sep != '.':
-            value = value.replace(decimal_sep, '.')
-            
+    def _run_import(self, mapping, profiler, dry_run=False):
+        # The import of a single statement file, shared by the wizard and the
+        # headless imports of om.bank.statement.import.profile. Return the
+        # statements created, or the test logs, and the history record.
+        if not dry_run:
+            self._lock_journals(self.journal_id)
+        import_method = self._get_import_method()
+        if not import_method:
+            raise ValidationError(_("Invalid file format. Please upload a .csv, .xlsx, CAMT.053, OFX, MT940 or .zip file."))
+
+        with profiler.phase('decode'):
+            # Normally done when the file was uploaded
+            if not self.staged_attachment_id:
+                self.staged_attachment_id = self._stage_file()
+        with self._open_staged_file() as stream:
+            if dry_run and columnar.np is not None:
+                res = self._test_import_columnar(stream, mapping, profiler=profiler)
+            else:
+                res = import_method(stream, mapping, dry_run=dry_run, profiler=profiler)
+        if not dry_run:
+            self._match_imported_lines(res, profiler)
+        history = self._record_import_profile(profiler, dry_run, False if dry_run else res, self.reject_attachment_id)
+        return res, history
+
+    def _lock_journals(self, journals):
+        if not self._try_lock_journals(journals):
+            raise JournalBusyError(_("Another import into %s is in progress. Please try again once it is finished, "
+                              "or use Import in Background.") % ", ".join(journals.mapped('name')))
+
+    @api.model
+    def _try_lock_journals(self, journals):
+        # Imports into the same journal are serialised, as the opening balance
+        # of their statements and the numbers of their entries follow the
+        # journal's last lines; imports into other journals run in parallel.
+        # The journal rows stay locked until the end of the transaction. A
+        # busy journal is reported at once rather than waited for: after the
+        # wait, this transaction would still not see the other import's lines.
         try:
-            return float(value)
-        except ValueError:
-             # Let caller handle error
-             raise ValueError("Invalid Float")
+            with self.env.cr.savepoint(flush=False), mute_logger('odoo.sql_db'):
+                self.env.cr.execute(
+                    "SELECT id FROM account_journal WHERE id IN %s ORDER BY id FOR NO KEY UPDATE NOWAIT",
+                    [tuple(journals.ids)])
+        except psycopg2.errors.LockNotAvailable:
+            return False
+        return True
 
-    def _parse_date(self, value):
-        if not value:
-             return False
-        
-        if isinstance(value, datetime):
-            return value.date()
-        if isinstance(value, (int, float)): # Excel serial date
-             pass
+    def _record_import_profile(self, profiler, dry_run, statement=False, rejects=None):
+        # Structured log line and import history record of the timings, which
+        # keeps the reject files of the import
+        profile = profiler.to_dict()
+        _logger.info(f"Bank statement import {self.file_name!r}: {profiler.to_json()}")
+        history = self.env['om.bank.statement.import.history'].create({
+            'name': self.file_name or 'Imported Statement',
+            'journal_id': self.journal_id.id,
+            'statement_ids': [(6, 0, statement.ids if statement else [])],
+            'dry_run': dry_run,
+            'rows_valid': profiler.counters.get('rows_valid', 0),
+            'rows_skipped': profiler.counters.get('rows_skipped', 0),
+            'duration': profile['duration'],
+            'query_count': profile['queries'],
+            'profile': profile,
+            'report': profiler.format_report(),
+            'reject_attachment_ids': [(6, 0, rejects.ids if rejects else [])],
+        })
+        if rejects:
+            # History records are read-only to users, who may still attach
+            # the reject files of their own import
+            rejects.sudo().write({'res_model': history._name, 'res_id': history.id})
+        return history
 
-        # Map selection key to actual format string
-        format_map = {
-            'iso_dash': '%Y-%m-%d',
-            'eu_slash': '%d/%m/%Y',
-            'us_slash': '%m/%d/%Y',
-            'eu_dash': '%d-%m-%Y',
-            'eu_dot': '%d.%m.%Y',
-            'iso_slash': '%Y/%m/%d',
-            'eu_short': '%d/%m/%y',
-            'us_short': '%m/%d/%y',
+    def _get_test_notification(self, logs, rejects=None):
+        message = "\n".join(logs)
+        is_success = True
+        if not logs:
+            title = _("Test Failed")
+            message = "No logs generated."
+            is_success = False
+        elif "Error" not in message and "Fail" not in message:
+            title = _("Test Successful!")
+            is_success = True
+        else:
+            title = _("Test Completed with Issues")
+            is_success = False
+        return self._get_notification(title, message, 'success' if is_success else 'warning', rejects)
+
+    def _get_notification(self, title, message, notification_type, rejects=None, next_action=None):
+        params = {
+            'title': title,
+            'message': message,
+            'type': notification_type,
+            'sticky': True,
+        }
+        if rejects:
+            # The client substitutes the %s of the message with the links in
+            # order, keep file content from being taken for one
+            params['message'] = "\n".join(filter(None, [
+                message.replace('%s', '% s'),
+                _("Rejected rows: ") + ", ".join(["%s"] * len(rejects)),
+            ]))
+            params['links'] = [{
+                'label': attachment.name,
+                'url': f'/web/content/{attachment.id}?download=true',
+            } for attachment in rejects]
+        if next_action:
+            params['next'] = next_action
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': params,
         }
-        date_fmt = format_map.get(self.date_format, '%Y-%m-%d')
 
-        value = str(value).strip()
-        try:
-            return datetime.strptime(value, date_fmt).date()
-        except ValueError:
-            # Fallback to standard ISO
-             try:
-                 return datetime.strptime(value, '%Y-%m-%d').date()
-             except:
-                 raise ValueError("Invalid Date")
-
-    def _import_csv(self, raw_data, mapping, dry_run=False):
-        logs = []
-        try:
-            data_file = io.StringIO(raw_data.decode(self.encoding or 'utf-8'))
-            
-            csv_separator = ','
-            if self.separator == 'semicolon':
-                csv_separator = ';'
-            elif self.separator == 'tab':
-                csv_separator = '\t'
-            elif self.separator == 'space':
-                csv_separator = ' '
-            
-            csv_quote = self.quote_char or '"'
-            
-            reader = csv.reader(data_file, delimiter=csv_separator, quotechar=csv_quote)
-            
-            statement_vals = {
-                'name': self.file_name or 'Imported Statement',
-                'journal_id': self.journal_id.id,
-                'line_ids': [],
+    def _get_error_collector(self, state=None):
+        # The reject file repeats the columns of the file after the row number and error
+        names = {line.column_index: line.column_name for line in self.mapping_line_ids}
+        header = [names.get(idx, f"Column {idx + 1}") for idx in range(max(names, default=-1) + 1)]
+        return ErrorCollector(header, state=state)
+
+    def _save_rejected_rows(self, errors):
+        if not errors.rejected:
+            self.reject_attachment_id = False
+            return
+        base_name = (self.file_name or 'statement').rsplit('.', 1)[0]
+        self.reject_attachment_id = self.env['ir.attachment'].create({
+            'name': f"{base_name}_rejected.csv",
+            'raw': errors.get_reject_content(),
+            'mimetype': 'text/csv',
+            'res_model': self._name,
+        })
+
+    def _is_batch(self):
+        return (self.file_name or '').lower().endswith('.zip') or bool(self.batch_file_ids)
+
+    def _get_batch_files(self, limit=None):
+        # (path, staged attachment) of the statement files of the batch: the
+        # uploaded file or the CSV/XLSX members of the uploaded archive, then
+        # the other attachments
+        files = []
+        if (self.file_name or '').lower().endswith('.zip'):
+            with self._open_staged_file() as stream, zipfile.ZipFile(stream) as archive:
+                for info in archive.infolist():
+                    base_name = info.filename.rsplit('/', 1)[-1]
+                    if info.is_dir() or info.filename.startswith('__MACOSX/') or base_name.startswith('.'):
+                        continue
+                    if not base_name.lower().endswith(STATEMENT_EXTENSIONS):
+                        continue
+                    files.append((info.filename, self._stage_content(archive.read(info), base_name)))
+                    if limit and len(files) >= limit:
+                        return files
+        elif self.file_data:
+            files.append((self.file_name or 'Imported Statement', self.staged_attachment_id or self._stage_file()))
+        for attachment in self.batch_file_ids:
+            if limit and len(files) >= limit:
+                break
+            if attachment.name.lower().endswith(STATEMENT_EXTENSIONS):
+                files.append((attachment.name, attachment))
+        return files
+
+    def _get_batch_wizards(self, limit=None):
+        # One in-memory wizard per file, with the options and mapping of this one
+        options = self._get_import_options()
+        bank_journals = self.env['account.journal'].search([
+            ('type', '=', 'bank'),
+            ('company_id', '=', self.journal_id.company_id.id),
+            ('bank_account_id', '!=', False),
+        ])
+        journal_numbers = [(journal.bank_account_id.sanitized_acc_number, journal) for journal in bank_journals]
+        wizards = []
+        for path, attachment in self._get_batch_files(limit=limit):
+            # A file named after the bank account of a journal goes to that journal
+            path_key = sanitize_account_number(path) or ''
+            journal = next((journal for number, journal in journal_numbers if number and number in path_key), self.journal_id)
+            options = dict(options, file_name=path.rsplit('/', 1)[-1])
+            wizard = self._new_from_options(options, journal, attachment)
+            # .txt/.xml files of an archive that are not statements
+            if wizard._get_import_method():
+                wizards.append(wizard)
+        return wizards
+
+    def _import_batch(self, mapping, dry_run=False, profiler=None):
+        # The files of a batch share their lookups: the partners, accounts and
+        # currencies of all files are resolved with one set of queries, and the
+        # existing lines of each journal are loaded once for the duplicate check.
+        wizards = self._get_batch_wizards()
+        if not wizards:
+            raise ValidationError(_("No statement file found to import."))
+        for journal in {wizard.journal_id for wizard in wizards}:
+            if not journal.suspense_account_id:
+                raise ValidationError(_("The journal '%s' does not have a Suspense Account defined. Please go to Accounting/Invoicing Configuration -> Journals and set a Suspense Account for this journal.") % journal.name)
+
+        if not dry_run:
+            self._lock_journals(self.env['account.journal'].union(*(wizard.journal_id for wizard in wizards)))
+        profiler = profiler or ImportProfiler(self.env.cr)
+        # The columns mapped on the wizard are those of the CSV and XLSX files,
+        # the structured statements of the batch keep their own layout
+        mappings = [wizard._get_file_mapping(mapping) for wizard in wizards]
+        file_keys = []
+        with profiler.phase('collect'):
+            for wizard, file_mapping in zip(wizards, mappings):
+                with wizard._open_staged_file() as stream:
+                    file_keys.append(wizard._collect_lookup_keys(wizard._iter_numbered_rows(stream), file_mapping))
+        all_keys = {
+            'partners': list(dict.fromkeys(key for keys in file_keys for key in keys['partners'])),
+            'currencies': list(dict.fromkeys(code for keys in file_keys for code in keys['currencies'])),
+        }
+        with profiler.phase('partners'):
+            partner_map, account_map = self._resolve_partners(all_keys['partners'], create=not dry_run)
+        with profiler.phase('currencies'):
+            currency_map = self._prefetch_currencies(all_keys['currencies'])
+        self._count_lookups(profiler, all_keys, partner_map, currency_map, account_map)
+        lookups = {
+            'partner_map': partner_map,
+            'currency_map': currency_map,
+            'account_map': account_map,
+        }
+
+        # Files of the same journal share one duplicate checker, which also
+        # catches transactions repeated in overlapping files of the batch
+        convert = self._get_row_converter(mapping)
+        journal_keys = {}
+        for wizard, keys in zip(wizards, file_keys):
+            _wizard, dates, import_ids = journal_keys.setdefault(wizard.journal_id, (wizard, set(), set()))
+            dates.update(keys['dates'])
+            import_ids.update(keys['import_ids'])
+        with profiler.phase('duplicates'):
+            checkers = {
+                journal: wizard._get_duplicate_checker(
+                    *self._get_date_range(convert, dates), import_ids, track_files=True)
+                for journal, (wizard, dates, import_ids) in journal_keys.items()
             }
-            
-            if self.has_header:
-                 try:
-                    next(reader) 
-                 except StopIteration:
-                     pass
-
-            row_idx = 1 if self.has_header else 0
-            valid_rows = 0
-            skipped_rows = 0
-            
-            for row in reader:
-                row_idx += 1
-                if not row:
-                    continue
-                
-                try:
-                    vals = self._extract_values(row, mapping)
-                    if not dry_run:
-                        statement_vals['line_ids'].append((0, 0, vals))
-                    valid_rows += 1
-                except Exception as e:
-                    skipped_rows += 1
-                    msg = f"Row {row_idx}: {str(e)}"
-                    logs.append(msg)
-                    if self.on_error == 'fail':
-                        raise ValidationError(msg)
-            
+
+        logs = []
+        statements = self.env['account.bank.statement']
+        rejects = self.env['ir.attachment']
+        for wizard, file_mapping, keys in zip(wizards, mappings, file_keys):
+            duplicates = checkers[wizard.journal_id]
+            prefetched = (lookups, keys, duplicates)
+            import_method = wizard._get_import_method()
+            try:
+                with wizard._open_staged_file() as stream:
+                    res = import_method(stream, file_mapping, dry_run=dry_run, prefetched=prefetched, profiler=profiler)
+            except ValidationError as e:
+                raise ValidationError(f"{wizard.file_name}: {e.args[0]}")
+            if duplicates:
+                duplicates.end_file()
+            rejects |= wizard.reject_attachment_id
             if dry_run:
-                 summary = f"Processed {row_idx} lines.\nValid: {valid_rows}\nSkipped: {skipped_rows}"
-                 logs.insert(0, summary)
-                 return logs
+                logs.append(f"{wizard.file_name} ({wizard.journal_id.name}):\n" + "\n".join(res))
+            else:
+                statements |= res
+                logs.append(f"{wizard.file_name}: {', '.join(res.mapped('name'))} ({wizard.journal_id.name}), "
+                            f"{len(res.line_ids)} lines")
 
-            if statement_vals['line_ids']:
-                return self.env['account.bank.statement'].create(statement_vals)
+        profiler.count('files', len(wizards))
+        if not dry_run:
+            # The open items are loaded once for all the files
+            self._match_imported_lines(statements, profiler)
+        self._record_import_profile(profiler, dry_run, False if dry_run else statements, rejects=rejects)
+        if dry_run:
+            return self._get_test_notification(logs + [profiler.format_report()], rejects)
+        return self._get_notification(
+            _("%d Bank Statements Imported") % len(statements), "\n".join(logs),
+            'warning' if rejects else 'success', rejects,
+            next_action={
+                'type': 'ir.actions.act_window',
+                'name': _('Bank Statements'),
+                'view_mode': 'tree,form',
+                'res_model': 'account.bank.statement',
+                'domain': [('id', 'in', statements.ids)],
+                'target': 'current',
+            })
+
+    def _test_import_columnar(self, stream, mapping, profiler=None):
+        # Dry run validating the date and amount columns in bulk, see tools/columnar.py
+        file_kind = FILE_KINDS.get(self._get_file_format(), 'File')
+        try:
+            date_idx = mapping['date']
+            amount_idx = mapping['amount']
+            partner_idx = mapping.get('partner')
+            account_idx = mapping.get('account_number')
+            import_id_idx = mapping.get('unique_import_id')
+            profiler = profiler or ImportProfiler(self.env.cr)
+            if self.test_sample != 'all':
+                with profiler.phase('sample'):
+                    sample = self._get_test_sample(self._iter_numbered_rows(stream))
+                iter_rows = lambda: iter(sample)
             else:
-                if skipped_rows > 0:
-                     raise ValidationError(_("No valid transactions found. %d lines were skipped due to errors.") % skipped_rows)
-                else:
-                     raise ValidationError(_("No valid transactions found."))
+                iter_rows = lambda: self._iter_numbered_rows(stream)
+            partner_keys = {}
+            import_ids = {}
+            row_numbers = []
+            date_values = []
+            amount_values = []
+            for row_idx, row in profiler.timed('parse', iter_rows()):
+                if not row or not any(row):
+                    continue
+                row_numbers.append(row_idx)
+                date_values.append(row[date_idx] if date_idx < len(row) else False)
+                amount_values.append(row[amount_idx] if amount_idx < len(row) else 0.0)
+                if partner_idx is not None or account_idx is not None:
+                    partner_keys.setdefault(partner_key(row, partner_idx, account_idx))
+                if import_id_idx is not None and import_id_idx < len(row) and row[import_id_idx]:
+                    import_ids.setdefault(f"{self.journal_id.id}-{str(row[import_id_idx]).strip()}")
+
+            with profiler.phase('validate'):
+                report = columnar.validate_columns(
+                    self._get_row_converter(mapping), self.date_format, row_numbers, date_values, amount_values,
+                    max_errors=max(self.test_max_errors, 0))
+            partner_keys = list(partner_keys)
+            with profiler.phase('partners'):
+                partner_map, account_map = self._resolve_partners(partner_keys, create=False)
+            with profiler.phase('duplicates'):
+                duplicate_rows, flagged_rows = self._test_duplicates_columnar(
+                    iter_rows, mapping, report, partner_map, account_map, import_ids)
+            profiler.count('rows_valid', report['valid'])
+            profiler.count('rows_skipped', len(report['errors']))
+            profiler.count('distinct_partners', len(partner_keys))
+            profiler.count('partners_by_account', len(account_map))
+            profiler.count('partners_by_name', len(partner_map))
+        except Exception as e:
+            return [f"Fatal {file_kind} Error: {str(e)}"]
+
+        if report['errors'] and self.on_error == 'fail':
+            return [f"Fatal {file_kind} Error: Row {report['errors'][0][0]}: {report['errors'][0][1]}"]
+        # The rows are not at hand anymore, the reject file only has their number and error
+        with closing(self._get_error_collector()) as errors:
+            for row_number, message in report['errors']:
+                errors.add(row_number, message)
+            self._save_rejected_rows(errors)
+
+        currency = self.journal_id.currency_id or self.journal_id.company_id.currency_id
+        summary = (
+            f"Processed {report['last_row']} lines.\nValid: {report['valid']}\nSkipped: {errors.total}\n"
+            f"Credits: {currency.round(report['credit'])}\nDebits: {currency.round(report['debit'])}\n"
+            f"Balance Change: {currency.round(report['balance'])}"
+        )
+        if report['date_from']:
+            summary += f"\nDates: {report['date_from']} to {report['date_to']}"
+        summary += self._get_test_duplicate_summary(duplicate_rows, flagged_rows)
+        summary += self._get_test_partner_summary(partner_keys, partner_map, account_map)
+        logs = [summary] + errors.report_lines()
+        if report['stopped']:
+            logs.append(f"Test stopped after {errors.total} errors.")
+        return logs
+
+    def _test_duplicates_columnar(self, iter_rows, mapping, report, partner_map, account_map, import_ids):
+        # Fingerprints need whole rows, so the rows found valid are read again
+        # and converted one by one, only when the journal has lines to compare
+        duplicates = self._get_duplicate_checker(report['date_from'], report['date_to'], import_ids)
+        if not duplicates:
+            return 0, 0
+        convert = self._get_row_converter(mapping, partner_map, account_map=account_map)
+        error_rows = {row_number for row_number, _message in report['errors']}
+        duplicate_rows = flagged_rows = 0
+        for row_idx, row in iter_rows():
+            if row_idx > report['last_row']:
+                break
+            if not row or not any(row) or row_idx in error_rows:
+                continue
+            vals = convert(row)
+            duplicate = duplicates.check(vals)
+            if not duplicate:
+                continue
+            if self._flag_duplicate(vals, duplicate, row_idx):
+                flagged_rows += 1
+                continue
+            # Skipped duplicates leave the totals of the statement
+            duplicate_rows += 1
+            report['valid'] -= 1
+            report['balance'] -= vals['amount']
+            report['credit' if vals['amount'] > 0 else 'debit'] -= vals['amount']
+        return duplicate_rows, flagged_rows
+
+    def _parse_float(self, value):
+        return self._get_row_converter({}).parse_float(value)
+
+    def _parse_date(self, value):
+        return self._get_row_converter({}).parse_date(value)
+
+    def _get_row_converter(self, mapping, partner_map=None, currency_map=None, account_map=None):
+        # Read the wizard options once, converting a row then only costs the conversion itself
+        return RowConverter(
+            mapping,
+            date_fmt=parsing.DATE_FORMATS.get(self.date_format, parsing.DEFAULT_DATE_FORMAT),
+            thousand_sep=parsing.THOUSAND_SEPARATORS.get(self.float_thousand_separator, ','),
+            decimal_sep=parsing.DECIMAL_SEPARATORS.get(self.float_decimal_separator, '.'),
+            col_names={line.column_index: line.column_name for line in self.mapping_line_ids},
+            journal_id=self.journal_id.id,
+            today=fields.Date.today(),
+            partner_map=partner_map,
+            currency_map=currency_map,
+            account_map=account_map,
+        )
+
+    def _get_csv_reader(self, data_file):
+        csv_separator = parsing.CSV_SEPARATORS.get(self.separator, ',')
+        csv_quote = self.quote_char or '"'
+        return csv.reader(data_file, delimiter=csv_separator, quotechar=csv_quote)
+
+    def _iter_csv_rows(self, stream):
+        # Decode incrementally while the reader pulls lines, rather than
+        # building one str of the whole file next to the raw bytes.
+        stream.seek(0)
+        data_file = io.TextIOWrapper(stream, encoding=self.encoding or 'utf-8', newline='')
+        try:
+            yield from self._get_csv_reader(data_file)
+        finally:
+            # Leave the underlying stream open for the next pass
+            data_file.detach()
+
+    def _import_csv(self, stream, mapping, dry_run=False, prefetched=None, profiler=None):
+        try:
+            def iter_rows():
+                return self._number_rows(self._iter_csv_rows(stream))
+
+            workers = self._get_parse_workers(stream)
+            if workers > 1 and (dry_run or prefetched):
+                # A test samples the rows with the cheap sequential reader,
+                # which also gives its lookups; a batch resolved them already
+                def iter_parsed_rows():
+                    return self._iter_csv_rows_parallel(stream, mapping, workers)
+
+                return self._import_rows(
+                    iter_parsed_rows, mapping, dry_run=dry_run, lookup_rows=iter_rows, prefetched=prefetched,
+                    profiler=profiler)
+            if workers > 1:
+                # The workers return the lookup keys of each chunk with its
+                # rows, resolved before the rows are converted: the file is
+                # parsed once
+                profiler = profiler or ImportProfiler(self.env.cr)
+                prefetched, extend_lookups = self._prefetch_by_chunk(mapping, profiler)
+
+                def iter_parsed_rows():
+                    return self._iter_csv_rows_parallel(stream, mapping, workers, on_keys=extend_lookups)
+
+                res = self._import_rows(iter_parsed_rows, mapping, prefetched=prefetched, profiler=profiler)
+                lookups, keys, _duplicates = prefetched
+                self._count_lookups(profiler, keys, **lookups)
+                return res
+
+            return self._import_rows(iter_rows, mapping, dry_run=dry_run, prefetched=prefetched, profiler=profiler)
 
         except Exception as e:
             if dry_run:
                 return [f"Fatal CSV Error: {str(e)}"]
             raise ValidationError(_("Error parsing CSV file: %s") % str(e))
 
-    def _import_xlsx(self, raw_data, mapping, dry_run=False):
-        logs = []
+    def _get_parse_workers(self, stream):
+        # Parsing in worker processes pays off on large files only. Processes
+        # are forked, which is only safe in the single-threaded workers of a
+        # multi-process server.
+        if not config['workers'] or (self.encoding or 'utf-8') not in csv_parallel.SPLITTABLE_ENCODINGS:
+            return 0
+        if len(self.quote_char or '"') != 1:
+            return 0
+        stream.seek(0, io.SEEK_END)
+        if stream.tell() < PARALLEL_PARSE_MIN_SIZE:
+            return 0
+        workers = self.env['ir.config_parameter'].sudo().get_param('om_bank_statement_import_custom.parse_workers')
+        return int(workers) if workers else min(os.cpu_count() or 1, 8)
+
+    def _iter_csv_rows_parallel(self, stream, mapping, workers, on_keys=None):
+        # on_keys, when given, receives the lookup keys of every chunk of the
+        # file before its rows, see _prefetch_by_chunk()
+        options = {
+            'encoding': self.encoding or 'utf-8',
+            'delimiter': parsing.CSV_SEPARATORS.get(self.separator, ','),
+            'quotechar': self.quote_char or '"',
+            'has_header': self.has_header,
+            # Partner and currency lookups stay in this process
+            'converter': self._get_row_converter(mapping),
+        }
+        if on_keys:
+            options['lookup_keys'] = {
+                'mapping': mapping,
+                'journal_id': self.journal_id.id,
+                'check_duplicates': self.duplicate_handling != 'none',
+            }
+        return csv_parallel.iter_parsed_rows(stream, options, workers, on_keys=on_keys)
+
+    def _iter_xlsx_rows(self, stream):
+        # Read-only workbooks parse the sheet XML lazily, so rows are yielded
+        # one at a time and memory does not grow with the sheet size.
+        wb = openpyxl.load_workbook(stream, read_only=True, data_only=True)
         try:
-            wb = openpyxl.load_workbook(io.BytesIO(raw_data), data_only=True)
-            
-            # Use selected sheet
+            # Use selected sheet, default to the first one if not selected or invalid
             if self.sheet_options and self.sheet_options in wb.sheetnames:
                 sheet = wb[self.sheet_options]
             else:
                 sheet = wb.worksheets[0]
-            
-            statement_vals = {
-                'name': self.file_name or 'Imported Statement',
-                'journal_id': self.journal_id.id,
-                'line_ids': [],
-            }
-            
-            rows = list(sheet.iter_rows(values_only=True))
-            
-            start_row = 1 if self.has_header else 0
-            row_idx = start_row
-            valid_rows = 0
-            skipped_rows = 0
-            
-            for row in rows[start_row:]:
-                row_idx += 1
-                if not row or not any(row):
-                    continue
-                
-                try:
-                    vals = self._extract_values(row, mapping)
-                    if not dry_run:
-                        statement_vals['line_ids'].append((0, 0, vals))
-                    valid_rows += 1
-                except Exception as e:
-                    skipped_rows += 1
-                    msg = f"Row {row_idx}: {str(e)}"
-                    logs.append(msg)
-                    if self.on_error == 'fail':
-                         raise ValidationError(msg)
+            yield from sheet.iter_rows(values_only=True)
+        finally:
+            wb.close()
 
-            if dry_run:
-                 summary = f"Processed {len(rows)} lines.\nValid: {valid_rows}\nSkipped: {skipped_rows}"
-                 logs.insert(0, summary)
-                 return logs
+    def _number_rows(self, rows):
+        # Skip the header and pair every row with its row number in the file
+        if self.has_header:
+            next(rows, None)
+        return enumerate(rows, start=2 if self.has_header else 1)
 
-            if statement_vals['line_ids']:
-                return self.env['account.bank.statement'].create(statement_vals)
-            else:
-                 if skipped_rows > 0:
-                     raise ValidationError(_("No valid transactions found. %d lines were skipped due to errors.") % skipped_rows)
-                 else:
-                     raise ValidationError(_("No valid transactions found."))
+    def _iter_numbered_rows(self, stream):
+        file_format = self._get_file_format()
+        if file_format == 'csv':
+            return self._number_rows(self._iter_csv_rows(stream))
+        if file_format == 'xlsx':
+            return self._number_rows(self._iter_xlsx_rows(stream))
+        if file_format in statement_formats.READERS:
+            # No header, row numbers count the transactions
+            return enumerate(self._iter_statement_rows(stream), start=1)
+        raise ValidationError(_("Invalid file format. Please upload a .csv, .xlsx, CAMT.053, OFX or MT940 file."))
+
+    def _get_file_format(self):
+        # 'csv', 'xlsx' and 'zip' by extension, the structured statement
+        # formats ('camt', 'ofx', 'mt940') by content, False when unknown
+        file_name = (self.file_name or '').lower()
+        for extension in ('csv', 'xlsx', 'zip'):
+            if file_name.endswith('.' + extension):
+                return extension
+        if not (self.staged_attachment_id or self.file_data):
+            return False
+        with self._open_staged_file() as stream:
+            return statement_formats.sniff_format(stream.read(statement_formats.SNIFF_SIZE))
+
+    def _get_file_mapping(self, mapping):
+        # Structured statements are read as rows of statement_formats.COLUMNS,
+        # whatever the columns mapped for the spreadsheets
+        if self._get_file_format() in statement_formats.READERS:
+            return {target: idx for idx, target in enumerate(statement_formats.MAPPING)}
+        return mapping
+
+    def _get_import_method(self):
+        return {
+            'csv': self._import_csv,
+            'xlsx': self._import_xlsx,
+            'camt': self._import_statement,
+            'ofx': self._import_statement,
+            'mt940': self._import_statement,
+        }.get(self._get_file_format())
+
+    def _iter_statement_rows(self, stream):
+        reader = statement_formats.READERS[self._get_file_format()]
+        return reader(stream, encoding=self.encoding or 'utf-8')
+
+    def _import_xlsx(self, stream, mapping, dry_run=False, prefetched=None, profiler=None):
+        try:
+            def iter_rows():
+                return self._number_rows(self._iter_xlsx_rows(stream))
+
+            return self._import_rows(iter_rows, mapping, dry_run=dry_run, prefetched=prefetched, profiler=profiler)
 
         except Exception as e:
             if dry_run:
                 return [f"Fatal XLSX Error: {str(e)}"]
             raise ValidationError(_("Error parsing XLSX file: %s") % str(e))
 
-    def _extract_values(self, row, mapping):
-        # row is a list/tuple of values
-        
-        # 1. Date
-        date_idx = mapping.get('date')
-        date_val = row[date_idx] if date_idx < len(row) else False
+    def _import_statement(self, stream, mapping, dry_run=False, prefetched=None, profiler=None):
+        # CAMT.053, OFX and MT940, read as rows of statement_formats.COLUMNS
+        file_kind = FILE_KINDS[self._get_file_format()]
         try:
-             date_obj = self._parse_date(date_val)
-             if not date_obj:
-                 date_obj = fields.Date.today()
-        except ValueError as e:
-             # Add context about column
-             col_name = "Unknown"
-             for line in self.mapping_line_ids:
-                 if line.column_index == date_idx:
-                     col_name = line.column_name
-                     break
-             raise UserError(f"Date Error: '{date_val}' in column '{col_name}' (Index {date_idx}) - {str(e)}")
-
-        # 2. Label
-        label_idx = mapping.get('payment_ref')
-        label_val = row[label_idx] if label_idx is not None and label_idx < len(row) else '/'
-        label_val = str(label_val) if label_val else '/'
-        
-        # 3. Partner
-        partner_id = False
+            def iter_rows():
+                return self._iter_numbered_rows(stream)
+
+            return self._import_rows(iter_rows, mapping, dry_run=dry_run, prefetched=prefetched, profiler=profiler)
+
+        except Exception as e:
+            if dry_run:
+                return [f"Fatal {file_kind} Error: {str(e)}"]
+            raise ValidationError(_("Error parsing %s file: %s") % (file_kind, str(e)))
+
+    def _import_rows(self, iter_rows, mapping, dry_run=False, lookup_rows=None, prefetched=None, profiler=None):
+        # iter_rows is a callable returning a fresh iterator of (row number, row),
+        # so the file can be walked once for lookups and once for the lines.
+        # lookup_rows can provide a cheaper iterator for the lookup pass.
+        # prefetched is the (lookups, keys, duplicate checker) of this file when
+        # already resolved, see _import_batch().
+        profiler = profiler or ImportProfiler(self.env.cr)
+        logs = []
+        errors = self._get_error_collector()
+        if dry_run and self.test_sample != 'all':
+            with profiler.phase('sample'):
+                sample = self._get_test_sample((lookup_rows or iter_rows)())
+            iter_rows = lookup_rows = lambda: iter(sample)
+        if prefetched:
+            lookups, keys, duplicates = prefetched
+        else:
+            # A test only reads: partners are looked up, never created
+            lookups, keys = self._prefetch_related_records(
+                (lookup_rows or iter_rows)(), mapping, create=not dry_run, profiler=profiler)
+        max_errors = max(self.test_max_errors, 0) if dry_run else 0
+
+        # With a batch size the statement header is created with the first
+        # batch and lines are appended batch by batch, otherwise everything
+        # goes in a single create. A split import has a statement and a batch
+        # of pending lines per partition, see _get_split_key().
+        batch_size = max(self.batch_size, 0)
+        Statement = self.env['account.bank.statement']
+        statements = {}
+        pending = {}
+
+        def create_lines(key):
+            if key not in statements:
+                statements[key] = Statement.create(self._prepare_statement_vals(key))
+            self._create_statement_lines(statements[key], pending.pop(key))
+
+        convert = self._get_row_converter(mapping, **lookups)
+        if not prefetched:
+            with profiler.phase('duplicates'):
+                duplicates = self._get_duplicate_checker(*self._get_date_range(convert, keys['dates']), keys['import_ids'])
         partner_idx = mapping.get('partner')
-        if partner_idx is not None and partner_idx < len(row):
-             partner_name = str(row[partner_idx]).strip() if row[partner_idx] else ''
-             partner_id = self._find_or_create_partner(partner_name)
+        check_partner = partner_idx is not None or 'account_number' in mapping
+        perf_counter = time.perf_counter
+        extract_time = 0.0
+        row_idx = 0
+        valid_rows = 0
+        skipped_rows = 0
+        duplicate_rows = 0
+        flagged_rows = 0
+        partner_rows = 0
+        partner_found_rows = 0
 
-        # 4. Amount
-        amount_idx = mapping.get('amount')
-        amount_val = row[amount_idx] if amount_idx < len(row) else 0.0
-        try:
-             amount = self._parse_float(amount_val)
-        except ValueError:
-             col_name = "Unknown"
-             for line in self.mapping_line_ids:
-                 if line.column_index == amount_idx:
-                     col_name = line.column_name
-                     break
-             raise UserError(f"Amount Error: '{amount_val}' in column '{col_name}' (Index {amount_idx})")
-        
-        # 5. Currency
-        foreign_currency_id = False
-        amount_currency = 0.0
-        
-        currency_code_idx = mapping.get('foreign_currency_code')
-        amount_currency_idx = mapping.get('amount_currency')
-        
-        if currency_code_idx is not None and currency_code_idx < len(row):
-            code = str(row[currency_code_idx]).strip()
-            if code:
-                currency = self.env['res.currency'].search([('name', '=', code)], limit=1)
-                if currency:
-                    foreign_currency_id = currency.id
-                
-        if foreign_currency_id:
-             if amount_currency_idx is not None and amount_currency_idx < len(row):
-                  try:
-                       amount_currency = self._parse_float(row[amount_currency_idx])
-                  except ValueError:
-                       amount_currency = 0.0
-             else:
-                  # If no specific foreign amount column, assume main amount is foreign
-                  pass 
-
-        vals = {
-            'date': date_obj,
-            'payment_ref': label_val,
-            'partner_id': partner_id,
-            'amount': amount,
+        with closing(profiler.timed('parse', iter_rows())) as rows, closing(errors):
+            for row_idx, row in rows:
+                # Rows that failed validation in a parsing worker come as errors
+                parse_error = isinstance(row, csv_parallel.RowParseError)
+                if not parse_error and (not row or not any(row)):
+                    continue
+
+                start = perf_counter()
+                try:
+                    if parse_error:
+                        raise row
+                    vals = convert(row)
+                except Exception as e:
+                    skipped_rows += 1
+                    if self.on_error == 'fail':
+                        raise ValidationError(f"Row {row_idx}: {str(e)}")
+                    errors.add(row_idx, str(e), None if parse_error else row)
+                    if max_errors and skipped_rows >= max_errors:
+                        logs.append(f"Test stopped after {skipped_rows} errors.")
+                        break
+                    continue
+                finally:
+                    extract_time += perf_counter() - start
+
+                duplicate = duplicates.check(vals) if duplicates else False
+                if duplicate:
+                    if not self._flag_duplicate(vals, duplicate, row_idx):
+                        duplicate_rows += 1
+                        continue
+                    flagged_rows += 1
+                if duplicates:
+                    duplicates.record(vals)
+                if check_partner and (vals['partner_id'] or vals.get('account_number') or (
+                        partner_idx is not None and partner_idx < len(row) and row[partner_idx])):
+                    partner_rows += 1
+                    partner_found_rows += bool(vals['partner_id'])
+                if not dry_run:
+                    key = self._get_split_key(vals, valid_rows)
+                    lines_vals = pending.setdefault(key, [])
+                    lines_vals.append(vals)
+                    if batch_size and len(lines_vals) >= batch_size:
+                        with profiler.phase('create'):
+                            create_lines(key)
+                valid_rows += 1
+            self._save_rejected_rows(errors)
+
+        profiler.add_time('extract', extract_time)
+        profiler.count('rows_valid', valid_rows)
+        profiler.count('rows_skipped', skipped_rows)
+        profiler.count('rows_with_partner', partner_rows)
+        profiler.count('rows_partner_found', partner_found_rows)
+        profiler.count('distinct_dates', len(convert.date_cache))
+
+        if dry_run:
+            summary = f"Processed {row_idx} lines.\nValid: {valid_rows}\nSkipped: {skipped_rows}"
+            summary += self._get_test_duplicate_summary(duplicate_rows, flagged_rows)
+            summary += self._get_test_partner_summary(keys['partners'], lookups['partner_map'], lookups['account_map'])
+            return [summary] + errors.report_lines() + logs
+
+        if not valid_rows:
+            if duplicate_rows:
+                raise ValidationError(_("No new transactions found. %d lines were already imported.") % duplicate_rows)
+            if skipped_rows > 0:
+                raise ValidationError(_("No valid transactions found. %d lines were skipped due to errors.") % skipped_rows)
+            raise ValidationError(_("No valid transactions found."))
+
+        with profiler.phase('create'):
+            if not batch_size and not self._use_bulk_insert():
+                for key, lines_vals in pending.items():
+                    statement_vals = self._prepare_statement_vals(key)
+                    statement_vals['line_ids'] = [(0, 0, vals) for vals in lines_vals]
+                    statements[key] = Statement.create(statement_vals)
+            else:
+                for key in list(pending):
+                    create_lines(key)
+            return self._chain_statement_balances(Statement.union(*statements.values()))
+
+    def _prepare_statement_vals(self, split_key=False):
+        name = self.file_name or 'Imported Statement'
+        if split_key:
+            name = f"{name} ({split_key})"
+        return {
+            'name': name,
             'journal_id': self.journal_id.id,
         }
-        
-        if foreign_currency_id:
-             vals['foreign_currency_id'] = foreign_currency_id
-             vals['amount_currency'] = amount_currency
-             
-        return vals
+
+    def _get_split_key(self, vals, line_count):
+        # Partition of a line of a split import, False when not split.
+        # line_count is the number of lines of the file before this one.
+        if self.split_by == 'day':
+            return vals['date'].isoformat()
+        if self.split_by == 'week':
+            year, week, _weekday = vals['date'].isocalendar()
+            return f"{year}-W{week:02d}"
+        if self.split_by == 'month':
+            return vals['date'].strftime('%Y-%m')
+        if self.split_by == 'lines':
+            return str(line_count // max(self.split_max_lines, 1) + 1)
+        return False
+
+    def _chain_statement_balances(self, statements):
+        # The statements of an import follow each other in time, each one
+        # opening with the closing balance of the previous one. The first one
+        # opens after the journal's statements before it, computed now that it
+        # has lines.
+        statements = statements.sorted(lambda statement: statement.first_line_index or '')
+        statements[:1]._compute_balance_start()
+        previous = False
+        for statement in statements:
+            if previous:
+                statement.balance_start = previous.balance_end_real
+            statement.balance_end_real = statement.balance_end
+            previous = statement
+        return statements
+
+    def _match_imported_lines(self, statements, profiler=None):
+        # Post-import matching against the open items, see
+        # account.bank.statement.line._match_open_items()
+        if self.auto_reconcile == 'none' or not statements:
+            return
+        profiler = profiler or ImportProfiler(self.env.cr)
+        with profiler.phase('matching'):
+            counts = statements.line_ids._match_open_items(apply=self.auto_reconcile == 'apply')
+        for reason in ('reference', 'partner', 'amount'):
+            profiler.count(f'matched_by_{reason}', counts[reason])
+        if self.auto_reconcile == 'apply':
+            profiler.count('lines_reconciled', counts['reconciled'])
+
+    def _use_bulk_insert(self):
+        if self.insert_mode != 'bulk':
+            return False
+        if not self.env['account.bank.statement.line']._can_bulk_create(self.journal_id):
+            _logger.info("Journal %s does not support bulk inserts, lines are created by the ORM", self.journal_id.name)
+            return False
+        return True
+
+    def _create_statement_lines(self, statement, lines_vals):
+        StatementLine = self.env['account.bank.statement.line']
+        lines_vals = [dict(vals, statement_id=statement.id) for vals in lines_vals]
+        with self.env.cr.savepoint():
+            if self._use_bulk_insert():
+                StatementLine._bulk_create(lines_vals)
+            else:
+                StatementLine.create(lines_vals)
+        # Release the records of this batch from the cache before the next one
+        for model_name in ('account.bank.statement.line', 'account.move', 'account.move.line'):
+            self.env[model_name].invalidate_model()
+
+    def _get_test_sample(self, rows):
+        # Rows checked by a test import when it does not check the whole file
+        size = max(self.test_sample_size, 0)
+        rows = ((row_idx, row) for row_idx, row in rows if row and any(row))
+        if self.test_sample == 'first':
+            return list(itertools.islice(rows, size))
+        # Reservoir sampling, the file is read once whatever its size
+        rng = random.Random()
+        sample = []
+        for count, item in enumerate(rows):
+            if count < size:
+                sample.append(item)
+            else:
+                pos = rng.randrange(count + 1)
+                if pos < size:
+                    sample[pos] = item
+        return sorted(sample, key=lambda item: item[0])
+
+    def _get_test_duplicate_summary(self, duplicate_rows, flagged_rows):
+        summary = ""
+        if duplicate_rows:
+            summary += f"\nDuplicates skipped: {duplicate_rows}"
+        if flagged_rows:
+            summary += f"\nDuplicates flagged: {flagged_rows}"
+        return summary
+
+    def _get_test_partner_summary(self, partner_keys, partner_map, account_map):
+        missing = len({
+            name.lower() for name, account in partner_keys
+            if name and account not in account_map and name not in partner_map
+        })
+        if not missing:
+            return ""
+        if self.create_partner:
+            return f"\nPartners to create: {missing}"
+        return f"\nPartners not found: {missing}"
+
+    def _prefetch_related_records(self, rows, mapping, create=True, profiler=None):
+        # Collect the distinct partner names, bank accounts and currency codes of
+        # the file and resolve them with a few set-based queries instead of one
+        # search per row. Returns the lookups of the row converter and the
+        # collected keys.
+        profiler = profiler or ImportProfiler(self.env.cr)
+        with profiler.phase('collect'):
+            keys = self._collect_lookup_keys(rows, mapping)
+        with profiler.phase('partners'):
+            partner_map, account_map = self._resolve_partners(keys['partners'], create=create)
+        with profiler.phase('currencies'):
+            currency_map = self._prefetch_currencies(keys['currencies'])
+        self._count_lookups(profiler, keys, partner_map, currency_map, account_map)
+        lookups = {
+            'partner_map': partner_map,
+            'currency_map': currency_map,
+            'account_map': account_map,
+        }
+        return lookups, keys
+
+    def _prefetch_by_chunk(self, mapping, profiler):
+        # Lookups of a file parsed by workers, resolved chunk by chunk from the
+        # keys each worker collects. Returns the (lookups, keys, duplicate
+        # checker) given to _import_rows() as prefetched, empty, and the
+        # function adding the keys of a chunk to them.
+        lookups = {'partner_map': {}, 'currency_map': {}, 'account_map': {}}
+        keys = {'partners': {}, 'currencies': {}, 'dates': {}, 'import_ids': {}}
+        duplicates = None
+        if self.duplicate_handling != 'none':
+            currency = self.journal_id.currency_id or self.journal_id.company_id.currency_id
+            duplicates = DuplicateChecker(digits=currency.decimal_places)
+        convert = self._get_row_converter(mapping)
+        # Dates of the journal lines in the duplicate checker already
+        loaded_range = [False, False]
+        # Partner matcher of a fuzzy matching, built once when first needed
+        partner_cache = {}
+
+        def extend_lookups(chunk_keys):
+            new_keys = {}
+            for name, values in chunk_keys.items():
+                new_keys[name] = [value for value in values if value not in keys[name]]
+                keys[name].update(dict.fromkeys(new_keys[name]))
+            with profiler.phase('partners'):
+                partner_map, account_map = self._resolve_partners(new_keys['partners'], cache=partner_cache)
+            lookups['partner_map'].update(partner_map)
+            lookups['account_map'].update(account_map)
+            with profiler.phase('currencies'):
+                lookups['currency_map'].update(self._prefetch_currencies(new_keys['currencies']))
+            if duplicates is not None:
+                with profiler.phase('duplicates'):
+                    date_from, date_to = self._get_date_range(convert, new_keys['dates'])
+                    if date_from and loaded_range[0]:
+                        # The lines between the chunks' dates are read as well,
+                        # the loaded dates stay one range
+                        date_from, date_to = min(date_from, loaded_range[0]), max(date_to, loaded_range[1])
+                    self._extend_duplicate_checker(
+                        duplicates, (date_from, date_to), tuple(loaded_range), new_keys['import_ids'])
+                    if date_from:
+                        loaded_range[:] = [date_from, date_to]
+
+        return (lookups, keys, duplicates), extend_lookups
+
+    def _count_lookups(self, profiler, keys, partner_map, currency_map, account_map):
+        profiler.count('distinct_partners', len(keys['partners']))
+        profiler.count('partners_by_account', len(account_map))
+        profiler.count('partners_by_name', len(partner_map))
+        profiler.count('distinct_currencies', len(keys['currencies']))
+        profiler.count('currencies_found', len(currency_map))
+
+    def _collect_lookup_keys(self, rows, mapping):
+        # Partners are collected as distinct (name, bank account) pairs, dates
+        # and import ids bound the duplicate check
+        keys = self._get_lookup_keys(mapping)
+        for _row_idx, row in rows:
+            if not row or isinstance(row, csv_parallel.RowParseError):
+                continue
+            keys.add(row)
+        return keys.to_dict()
+
+    def _get_lookup_keys(self, mapping):
+        return LookupKeys(mapping, self.journal_id.id, self.duplicate_handling != 'none')
+
+    def _resolve_partners(self, partner_keys, create=True, cache=None):
+        # The bank account identifies the partner when it is known, the name
+        # is only looked up (or used to create a partner) for the other rows.
+        # cache: see _prefetch_partners()
+        account_map = self._prefetch_partner_accounts({account for _name, account in partner_keys if account})
+        names = {name: None for name, account in partner_keys if name and account not in account_map}
+        return self._prefetch_partners(list(names), create=create, cache=cache), account_map
+
+    def _prefetch_partner_accounts(self, accounts):
+        # Map the account numbers as written in the file to the partner owning
+        # them, through the sanitized number index of res.partner.bank
+        sanitized = {account: sanitize_account_number(account) for account in accounts}
+        sanitized = {account: number for account, number in sanitized.items() if number}
+        if not sanitized:
+            return {}
+        partner_by_number = {}
+        banks = self.env['res.partner.bank'].search([('sanitized_acc_number', 'in', list(set(sanitized.values())))])
+        for bank in banks:
+            partner_by_number.setdefault(bank.sanitized_acc_number, bank.partner_id.id)
+        return {
+            account: partner_by_number[number]
+            for account, number in sanitized.items() if number in partner_by_number
+        }
+
+    def _prefetch_partners(self, names, create=True, cache=None):
+        # cache: dict kept by the caller resolving the names of one import in
+        # several calls, the partner matcher is built once in it
+        names = [name for name in names if name]
+        if not names:
+            return {}
+
+        Partner = self.env['res.partner']
+        Partner.flush_model(['name'])
+        self.env.cr.execute("""
+            SELECT n.name, p.id
+              FROM unnest(%s::varchar[]) AS n(name)
+              JOIN res_partner p ON lower(p.name) = lower(n.name)
+        """, [names])
+        candidates = defaultdict(list)
+        for name, partner_id in self.env.cr.fetchall():
+            candidates[name].append(partner_id)
+
+        # Go through the ORM once so access rules, archived records and the
+        # default order give the same result as a per-name search(limit=1).
+        candidate_ids = {partner_id for ids in candidates.values() for partner_id in ids}
+        visible = Partner.search([('id', 'in', list(candidate_ids))]).ids if candidate_ids else []
+        rank = {partner_id: pos for pos, partner_id in enumerate(visible)}
+
+        partner_map = {}
+        for name, ids in candidates.items():
+            ids = [partner_id for partner_id in ids if partner_id in rank]
+            if ids:
+                partner_map[name] = min(ids, key=rank.get)
+
+        missing = [name for name in names if name not in partner_map]
+        if missing and self.partner_matching == 'fuzzy':
+            matcher = cache.get('matcher') if cache is not None else None
+            if matcher is None:
+                matcher = self._get_partner_matcher()
+                if cache is not None:
+                    cache['matcher'] = matcher
+            for name in missing:
+                partner_id = matcher.match(name)
+                if partner_id:
+                    partner_map[name] = partner_id
+            missing = [name for name in missing if name not in partner_map]
+
+        if missing and create and self.create_partner:
+            # One partner per case-insensitive name, keeping the first spelling
+            # found. Names are claimed first so that a concurrent import does not
+            # create them too, see om.bank.statement.import.partner; a
+            # serialization error of the claim is left to the caller's retry.
+            to_create = {}
+            for name in missing:
+                to_create.setdefault(name.lower(), name)
+            Registry = self.env['om.bank.statement.import.partner']
+            claimed, created = Registry._claim(to_create)
+            to_create = {key: name for key, name in to_create.items() if key not in created}
+            try:
+                with self.env.cr.savepoint():
+                    new_partners = Partner.create([
+                        {'name': name, 'type': 'contact'} for name in to_create.values()
+                    ])
+                new_by_key = dict(zip(to_create, new_partners.ids))
+                Registry._register({key: partner_id for key, partner_id in new_by_key.items() if key in claimed})
+                created.update(new_by_key)
+            except Exception as e:
+                _logger.warning(f"Failed to create partners {', '.join(to_create.values())}: {e}")
+                Registry._release(claimed)
+            for name in missing:
+                if name.lower() in created:
+                    partner_map[name] = created[name.lower()]
+
+        return partner_map
+
+    def _get_partner_matcher(self):
+        # Index of all partners visible to the user, read in one query in the
+        # default order so the preferred partner wins between equal names
+        query = self.env['res.partner']._search([('name', '!=', False)])
+        self.env.cr.execute(*query.select('"res_partner"."id"', '"res_partner"."name"'))
+        return PartnerMatcher(self.env.cr.fetchall(), threshold=self.partner_match_threshold or 0.8)
+
+    def _prefetch_currencies(self, codes):
+        codes = [code for code in codes if code]
+        if not codes:
+            return {}
+        currencies = self.env['res.currency'].search([('name', 'in', codes)])
+        return {currency.name: currency.id for currency in currencies}
+
+    def _get_date_range(self, convert, date_values):
+        # Range of the transaction dates among the distinct raw date values,
+        # values that do not parse are reported when their row is converted
+        dates = set()
+        for value in date_values:
+            try:
+                dates.add(convert.parse_date(value) or convert.today)
+            except ValueError:
+                continue
+        return (min(dates), max(dates)) if dates else (False, False)
+
+    def _get_duplicate_checker(self, date_from, date_to, import_ids, exclude_statements=None, track_files=False):
+        # The journal lines of the file's date range, plus the ones carrying one
+        # of its import ids, loaded with a single query
+        if self.duplicate_handling == 'none' or not (date_from or import_ids):
+            return None
+        for model_name in ('account.move', 'account.bank.statement.line'):
+            self.env[model_name].flush_model()
+        self.env.cr.execute("""
+            SELECT l.unique_import_id, m.date, l.amount, l.payment_ref, m.partner_id
+              FROM account_bank_statement_line l
+              JOIN account_move m ON m.id = l.move_id
+             WHERE m.journal_id = %(journal_id)s
+               AND m.state != 'cancel'
+               AND (m.date BETWEEN %(date_from)s AND %(date_to)s OR l.unique_import_id = ANY(%(import_ids)s))
+               AND (l.statement_id IS NULL OR l.statement_id != ALL(%(exclude_statements)s))
+        """, {
+            'journal_id': self.journal_id.id,
+            'date_from': date_from or None,
+            'date_to': date_to or None,
+            'import_ids': list(import_ids),
+            'exclude_statements': exclude_statements.ids if exclude_statements else [],
+        })
+        currency = self.journal_id.currency_id or self.journal_id.company_id.currency_id
+        return DuplicateChecker(self.env.cr.fetchall(), digits=currency.decimal_places, track_files=track_files)
+
+    def _extend_duplicate_checker(self, duplicates, date_range, loaded_range, import_ids):
+        # Add the journal lines of date_range but not of loaded_range, whose
+        # lines the checker has already, and the ones carrying one of the
+        # import ids. Lines of other dates only add their import id.
+        (date_from, date_to), (loaded_from, loaded_to) = date_range, loaded_range
+        if not ((date_from and (date_from, date_to) != (loaded_from, loaded_to)) or import_ids):
+            return
+        for model_name in ('account.move', 'account.bank.statement.line'):
+            self.env[model_name].flush_model()
+        in_range = "FALSE"
+        if date_from:
+            in_range = "m.date BETWEEN %(date_from)s AND %(date_to)s"
+            if loaded_from:
+                in_range += " AND m.date NOT BETWEEN %(loaded_from)s AND %(loaded_to)s"
+        self.env.cr.execute(f"""
+            SELECT l.unique_import_id, m.date, l.amount, l.payment_ref, m.partner_id, {in_range}
+              FROM account_bank_statement_line l
+              JOIN account_move m ON m.id = l.move_id
+             WHERE m.journal_id = %(journal_id)s
+               AND m.state != 'cancel'
+               AND ({in_range} OR l.unique_import_id = ANY(%(import_ids)s))
+        """, {
+            'journal_id': self.journal_id.id,
+            'date_from': date_from,
+            'date_to': date_to,
+            'loaded_from': loaded_from,
+            'loaded_to': loaded_to,
+            'import_ids': list(import_ids),
+        })
+        lines = self.env.cr.fetchall()
+        duplicates.add(line[:5] for line in lines if line[5])
+        duplicates.add((line[:5] for line in lines if not line[5]), fingerprints=False)
+
+    def _flag_duplicate(self, vals, duplicate, row_idx):
+        # Return whether a duplicate row is still imported, flagged
+        if self.duplicate_handling == 'fail':
+            raise ValidationError(_("Row %s: this transaction was already imported in journal %s.") % (row_idx, self.journal_id.name))
+        if self.duplicate_handling == 'skip' or duplicate == 'import_id':
+            # A known import id cannot be imported twice
+            return False
+        vals['import_duplicate'] = True
+        return True
+
+    def _extract_values(self, row, mapping, partner_map=None, currency_map=None, account_map=None):
+        # row is a list/tuple of values
+        # partner_map / currency_map / account_map are the lookups built by _prefetch_related_records;
+        # without them the partner and currency of this row are looked up on their own.
+        # Imports convert rows through a single _get_row_converter() instead.
+        if partner_map is None or currency_map is None:
+            lookups, _keys = self._prefetch_related_records([(0, row)], mapping)
+            return self._get_row_converter(mapping, **lookups)(row)
+        return self._get_row_converter(mapping, partner_map, currency_map, account_map)(row)
 
     def _find_or_create_partner(self, name):
         if not name:
             return False
-        # Case insensitive exact match or close match
-        partner = self.env['res.partner'].search([('name', '=ilike', name)], limit=1)
-        if partner:
-            return partner.id
-        elif self.create_partner:
-             # Create new partner
-             try:
-                 new_partner = self.env['res.partner'].create({'name': name, 'type': 'contact'})
-                 return new_partner.id
-             except Exception as e:
-                 _logger.warning(f"Failed to create partner {name}: {e}")
-                 return False
-        else:
-             return False
+        # Same lookup and race-free creation as the imports
+        return self._prefetch_partners([name]).get(name, False)
 
 class BankStatementImportMapping(models.TransientModel):
     _name = 'om.bank.statement.import.mapping'
@@ -572,6 +1703,8 @@ class BankStatementImportMapping(models.TransientModel):
         ('amount', 'Amount'),
         ('foreign_currency_code', 'Foreign Currency Code'),
         ('amount_currency', 'Foreign Currency Amount'),
+        ('account_number', 'Bank Account / IBAN'),
+        ('unique_import_id', 'Transaction ID'),
     ], string='Odoo Field')
 
 